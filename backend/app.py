@@ -4,31 +4,39 @@ Main Flask application entry point with MongoDB Atlas integration.
 """
 
 import logging
-
-# Suppress unnecessary logs but keep ERROR level visible
-logging.basicConfig(level=logging.WARNING)
-logging.getLogger('prophet').setLevel(logging.CRITICAL)
-logging.getLogger('prophet.plot').setLevel(logging.CRITICAL)
-logging.getLogger('werkzeug').setLevel(logging.WARNING)
-logging.getLogger('database').setLevel(logging.CRITICAL)
-logging.getLogger('__main__').setLevel(logging.WARNING)
+from datetime import datetime, timezone
 
 from dotenv import load_dotenv
 
 # Load environment variables before importing Config
 load_dotenv()
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
+from flask_compress import Compress
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 from database import Database, create_indexes
-from routes.auth_routes import auth_routes
-from routes.cost_routes import cost_routes
-from routes.anomaly_routes import anomaly_routes
-from routes.forecast_routes import forecast_routes
-from routes.report_routes import report_routes
+from json_provider import OrjsonProvider
+from rate_limit import limiter
 
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+def _configure_logging():
+    """
+    Suppress unnecessary logs but keep ERROR level visible.
+    Only installs a root handler if none exists, so repeated create_app()
+    calls (reloader, tests, gunicorn workers) never stack duplicate handlers.
+    """
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.CRITICAL)
+    logging.getLogger('prophet.plot').setLevel(logging.CRITICAL)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    logging.getLogger('database').setLevel(logging.CRITICAL)
 
 
 def create_app(config=Config):
@@ -36,9 +44,18 @@ def create_app(config=Config):
     Application factory pattern.
     Creates and configures the Flask application.
     """
+    _configure_logging()
     app = Flask(__name__)
     
     app.config.from_object(config)
+    # Behind a reverse proxy, take the client address from X-Forwarded-For so
+    # per-IP rate limits don't put every user in the proxy's bucket
+    if config.TRUSTED_PROXY_COUNT > 0:
+        hops = config.TRUSTED_PROXY_COUNT
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    app.json = OrjsonProvider(app)
+    limiter.init_app(app)
+    Compress(app)
     
     # Initialize MongoDB connection
     if Database.initialize():
@@ -46,8 +63,10 @@ def create_app(config=Config):
     else:
         logger.error("Failed to connect to MongoDB Atlas. Check MONGODB_URI in .env")
     
-    # Enable CORS (include both /api/* and upload endpoint)
-    CORS(app, resources={
+    # Enable CORS (include both /api/* and upload endpoint).
+    # max_age lets browsers reuse a preflight instead of sending OPTIONS
+    # before every cross-origin call from the dashboard.
+    CORS(app, max_age=config.CORS_PREFLIGHT_CACHE_SECONDS or None, resources={
         r"/api/*": {
             "origins": config.CORS_ORIGINS,
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
@@ -62,98 +81,136 @@ def create_app(config=Config):
         }
     })
     
-    # Register blueprints (routes)
+    # Register blueprints (routes).
+    # Imported here rather than at module level so that importing `app`
+    # doesn't drag in pandas/sklearn/prophet before the factory runs.
+    from routes.auth_routes import auth_routes
+    from routes.cost_routes import cost_routes
+    from routes.anomaly_routes import anomaly_routes
+    from routes.report_routes import report_routes
+    from routes.ingestion_routes import ingestion_routes
+
     app.register_blueprint(auth_routes)
     app.register_blueprint(cost_routes)
     app.register_blueprint(anomaly_routes)
-    app.register_blueprint(forecast_routes)
     app.register_blueprint(report_routes)
-    from routes.budget_routes import budget_routes
-    app.register_blueprint(budget_routes)
-    from routes.ingestion_routes import ingestion_routes
     app.register_blueprint(ingestion_routes)
+
+    # Optional features, toggled via Config
+    if config.ENABLE_FORECAST:
+        from routes.forecast_routes import forecast_routes
+        app.register_blueprint(forecast_routes)
+    if config.ENABLE_BUDGET:
+        from routes.budget_routes import budget_routes
+        app.register_blueprint(budget_routes)
     
+    # Static payloads are serialized once here instead of on every request.
+    index_body = app.json.dumps({
+        'application': 'Cloud Cost Behaviour Analytics and Anomaly Detection',
+        'version': '1.0.0',
+        'status': 'running',
+        'database': 'MongoDB Atlas',
+        'api_base': '/api',
+        'endpoints': {
+            'health': '/api/health',
+            'auth': {
+                'register': '/api/auth/register',
+                'login': '/api/auth/login',
+                'verify': '/api/auth/verify',
+                'me': '/api/auth/me'
+            }
+        }
+    })
+    api_root_body = app.json.dumps({
+        'message': 'Cloud Cost Analytics API',
+        'database': 'MongoDB Atlas',
+        'available_endpoints': [
+            'GET /api/health',
+            'POST /api/auth/register',
+            'POST /api/auth/login',
+            'GET /api/auth/verify',
+            'GET /api/auth/me',
+            'POST /api/costs/ingest',
+            'POST /api/costs/ingest/bulk',
+            'POST /api/costs/upload',
+            'GET /api/costs/upload/template',
+            'GET /api/costs',
+            'GET /api/costs/summary'
+        ]
+    })
+    not_found_body = app.json.dumps({
+        'error': 'Not Found',
+        'message': 'The requested resource does not exist',
+        'status': 404
+    })
+    rate_limited_body = app.json.dumps({
+        'error': 'Too Many Requests',
+        'message': 'Rate limit exceeded, try again later',
+        'status': 429
+    })
+    internal_error_body = app.json.dumps({
+        'error': 'Internal Server Error',
+        'message': 'An unexpected error occurred',
+        'status': 500
+    })
+    static_cache_headers = {'Cache-Control': 'public, max-age=60'}
+
     # Root endpoint
     @app.route('/', methods=['GET'])
     def index():
-        return jsonify({
-            'application': 'Cloud Cost Behaviour Analytics and Anomaly Detection',
-            'version': '1.0.0',
-            'status': 'running',
-            'database': 'MongoDB Atlas',
-            'api_base': '/api',
-            'endpoints': {
-                'health': '/api/health',
-                'auth': {
-                    'register': '/api/auth/register',
-                    'login': '/api/auth/login',
-                    'verify': '/api/auth/verify',
-                    'me': '/api/auth/me'
-                }
-            }
-        }), 200
+        return Response(index_body, status=200, mimetype='application/json', headers=static_cache_headers)
     
     @app.route('/api', methods=['GET'])
     def api_root():
-        return jsonify({
-            'message': 'Cloud Cost Analytics API',
-            'database': 'MongoDB Atlas',
-            'available_endpoints': [
-                'GET /api/health',
-                'POST /api/auth/register',
-                'POST /api/auth/login',
-                'GET /api/auth/verify',
-                'GET /api/auth/me',
-                'POST /api/costs/ingest',
-                'POST /api/costs/ingest/bulk',
-                'POST /api/costs/upload',
-                'GET /api/costs/upload/template',
-                'GET /api/costs',
-                'GET /api/costs/summary'
-            ]
-        }), 200
+        return Response(api_root_body, status=200, mimetype='application/json', headers=static_cache_headers)
 
     @app.route('/api/health', methods=['GET'])
     def health_check():
         """Health check endpoint to verify API and database status."""
-        from datetime import datetime
-        try:
-            # Check database connection
-            db = Database.get_db()
-            db.command('ping')
-            db_status = 'connected'
-        except Exception as e:
-            db_status = f'disconnected: {str(e)}'
+        # Cached liveness check; only pings Atlas once per TTL window
+        healthy, error = Database.is_healthy()
+        db_status = 'connected' if healthy else f'disconnected: {error}'
         
         return jsonify({
             'status': 'healthy',
             'database': db_status,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': datetime.now(timezone.utc).isoformat()
         }), 200
     
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
-        return jsonify({
-            'error': 'Not Found',
-            'message': 'The requested resource does not exist',
-            'status': 404
-        }), 404
+        return Response(not_found_body, status=404, mimetype='application/json')
+    
+    @app.errorhandler(429)
+    def rate_limited(error):
+        return Response(rate_limited_body, status=429, mimetype='application/json')
     
     @app.errorhandler(500)
     def internal_error(error):
-        return jsonify({
-            'error': 'Internal Server Error',
-            'message': 'An unexpected error occurred',
-            'status': 500
-        }), 500
+        return Response(internal_error_body, status=500, mimetype='application/json')
+    
+    @app.errorhandler(Exception)
+    def unhandled_exception(error):
+        # HTTP errors (404, 405, 429, ...) keep their own status and handlers
+        if isinstance(error, HTTPException):
+            return error
+        app.logger.exception("Unhandled error on %s", request.path)
+        return Response(internal_error_body, status=500, mimetype='application/json')
     
     return app
 
 
 if __name__ == '__main__':
+    import sys
     import warnings
     warnings.filterwarnings('ignore')
+
+    # The built-in server is for local development only.
+    # In production run: gunicorn "app:create_app()" (see gunicorn.conf.py)
+    if Config.FLASK_ENV != 'development':
+        print("FLASK_ENV is not 'development'; start the API with gunicorn \"app:create_app()\"", file=sys.stderr)
+        sys.exit(1)
     
     try:
         app = create_app()
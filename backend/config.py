@@ -10,11 +10,43 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production-make-it-strong')
     
     # CORS settings
-    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:5173,http://localhost:5174,http://localhost:3000,http://127.0.0.1:5173,http://127.0.0.1:5174').split(',')
+    # Immutable so nothing can mutate the shared origin list at runtime
+    CORS_ORIGINS = tuple(
+        origin.strip()
+        for origin in os.environ.get('CORS_ORIGINS', 'http://localhost:5173,http://localhost:5174,http://localhost:3000,http://127.0.0.1:5173,http://127.0.0.1:5174').split(',')
+        if origin.strip()
+    )
+    # How long browsers may cache a preflight response (0 disables caching)
+    CORS_PREFLIGHT_CACHE_SECONDS = int(os.environ.get('CORS_PREFLIGHT_CACHE_SECONDS', '600'))
+    
+    # Response compression (Flask-Compress): Brotli preferred, gzip fallback,
+    # skipped for bodies too small to benefit
+    COMPRESS_MIMETYPES = ['application/json', 'text/csv', 'text/plain']
+    COMPRESS_ALGORITHM = ['br', 'gzip']
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', '4'))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+    
+    # Optional feature blueprints (disable to skip loading their dependencies)
+    ENABLE_FORECAST = os.environ.get('ENABLE_FORECAST', 'true').lower() == 'true'
+    ENABLE_BUDGET = os.environ.get('ENABLE_BUDGET', 'true').lower() == 'true'
     
     # MongoDB Atlas Configuration
     MONGODB_URI = os.environ.get('MONGODB_URI', '')
     DATABASE_NAME = os.environ.get('DATABASE_NAME') or os.environ.get('MONGODB_DB_NAME') or 'cloud_cost_analytics'
+    # Connection pool sizing (threaded server shares one client across requests).
+    # Under gunicorn's gevent workers each greenlet holds its own socket while a
+    # query runs, so the default grows with GUNICORN_WORKER_CONNECTIONS (max 200).
+    MONGODB_MAX_POOL_SIZE = int(os.environ.get(
+        'MONGODB_MAX_POOL_SIZE',
+        str(min(int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000')), 200))
+        if os.environ.get('GUNICORN_WORKER_CLASS') == 'gevent' else '50'
+    ))
+    MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', '5'))
+    MONGODB_MAX_IDLE_TIME_MS = int(os.environ.get('MONGODB_MAX_IDLE_TIME_MS', '60000'))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+    # Wire compression, negotiated with the server in order of preference
+    MONGODB_COMPRESSORS = os.environ.get('MONGODB_COMPRESSORS', 'zstd,snappy,zlib')
     
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get(
@@ -23,13 +55,40 @@ class Config:
     )
     JWT_EXPIRATION_DELTA = timedelta(days=int(os.environ.get('JWT_EXPIRATION_DAYS', '7')))
     JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+    # Reuse verified tokens for up to JWT_CACHE_TTL_SECONDS (capped at 60 so
+    # a deleted user's token stops working within a minute on every worker)
+    JWT_CACHE_ENABLED = os.environ.get('JWT_CACHE_ENABLED', 'true').lower() == 'true'
+    JWT_CACHE_TTL_SECONDS = min(int(os.environ.get('JWT_CACHE_TTL_SECONDS', '60')), 60)
     
-    # Password hashing
-    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', '12'))
+    # Password hashing (Argon2id; memory cost in KiB). The defaults are the
+    # OWASP minimum and hash in well under 250ms on typical hardware.
+    # Legacy bcrypt hashes still verify and are upgraded on next login.
+    ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', '2'))
+    ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', '19456'))
+    ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', '1'))
+    
+    # Rate limiting. memory:// is per-process; use redis://host:6379 when
+    # running several gunicorn workers so they share one set of counters.
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    # Applied per client IP to endpoints that hash passwords (login, register);
+    # only POSTs count, so CORS preflights don't use up the allowance
+    AUTH_RATE_LIMIT = os.environ.get('AUTH_RATE_LIMIT', '5 per minute')
+    # Number of reverse proxies in front of the app whose X-Forwarded-For /
+    # -Proto / -Host headers are trusted (0 = none; client IP is the socket peer).
+    # Must match the deployment: too high lets clients spoof their IP.
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
     
     # Pagination
     DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '50'))
     MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '100'))
+    # Listing counts stop after this many matches and are reported as an
+    # estimate (0 = always count exactly)
+    PAGINATION_COUNT_LIMIT = int(os.environ.get('PAGINATION_COUNT_LIMIT', '10000'))
+
+    # Bulk ingestion (records accepted per request)
+    MAX_BULK_RECORDS = int(os.environ.get('MAX_BULK_RECORDS', '1000'))
+    # Concurrent insert batches when a large ingest is split into chunks
+    BULK_INGEST_WORKERS = int(os.environ.get('BULK_INGEST_WORKERS', '4'))
 
     # Email / SMTP Configuration (use environment variables for secrets)
     EMAIL_HOST = os.environ.get('EMAIL_HOST', '')
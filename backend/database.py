@@ -3,13 +3,27 @@ MongoDB Database Connection Module
 Handles MongoDB Atlas connectivity and database operations.
 """
 
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, ConfigurationError
+from pymongo import MongoClient, IndexModel
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, ConfigurationError, OperationFailure
 from config import Config
 import logging
+import threading
+import time
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Health-check cache: a real ping is sent at most once per TTL window.
+_HEALTH_CHECK_TTL_SECONDS = 5
+_last_ping_ts = None
+_last_ping_ok = False
+_last_ping_error = None
+
+# Serializes lazy reconnects in get_db so concurrent requests don't each
+# open a client
+_init_lock = threading.Lock()
+_last_init_failure_ts = None
+
 
 class Database:
     """MongoDB Database connection handler."""
@@ -47,23 +61,39 @@ class Database:
             uri = Database._validate_connection_string(Config.MONGODB_URI)
             
             # Create MongoDB client with increased timeout for initial connection
-            Database.client = MongoClient(
+            client = MongoClient(
                 uri,
                 serverSelectionTimeoutMS=30000,  # Increased to 30 seconds
                 connectTimeoutMS=30000,
                 socketTimeoutMS=30000,
                 retryWrites=True,
-                retryReads=True
+                retryReads=True,
+                # minPoolSize makes the driver open sockets in the background
+                # so the first real request doesn't pay the TLS/auth handshake.
+                maxPoolSize=Config.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=Config.MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=Config.MONGODB_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=Config.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                compressors=Config.MONGODB_COMPRESSORS,
+                zlibCompressionLevel=6
             )
             
-            # Test the connection with a ping command
-            Database.client.admin.command('ping')
-            
-            # Get database
-            Database.db = Database.client[Config.DATABASE_NAME]
+            try:
+                # Test the connection with a ping command (forces the initial handshake)
+                client.admin.command('ping')
+                db = client[Config.DATABASE_NAME]
+                # Verify database access
+                db.command('ping')
+            except Exception:
+                client.close()
+                raise
             
-            # Verify database access
-            Database.db.command('ping')
+            # Only publish a client that answered, so a failed attempt leaves
+            # client/db unset and the next get_db()/is_healthy() retries
+            Database.client = client
+            Database.db = db
+            # Drop collection handles bound to any previous client
+            get_collection.cache_clear()
             
             logger.info("MongoDB Atlas connected")
             return True
@@ -87,11 +117,70 @@ class Database:
     
     @staticmethod
     def get_db():
-        """Get database instance."""
-        if Database.db is None:
-            Database.initialize()
-        return Database.db
+        """
+        Get database instance. create_app (or the worker's post_fork)
+        normally connects; if that attempt failed, connecting is retried here,
+        at most once per _HEALTH_CHECK_TTL_SECONDS while MongoDB stays down.
+        """
+        global _last_init_failure_ts
+        db = Database.db
+        if db is None:
+            with _init_lock:
+                if Database.db is None:
+                    # Callers queued behind a failed attempt fail fast instead
+                    # of each running their own server-selection timeout
+                    recently_failed = (
+                        _last_init_failure_ts is not None
+                        and time.monotonic() - _last_init_failure_ts < _HEALTH_CHECK_TTL_SECONDS
+                    )
+                    if recently_failed or not Database.initialize():
+                        if not recently_failed:
+                            _last_init_failure_ts = time.monotonic()
+                        raise RuntimeError("Database not available; check MONGODB_URI and connectivity")
+                    _last_init_failure_ts = None
+            db = Database.db
+        return db
     
+    @staticmethod
+    def is_healthy():
+        """
+        Report whether MongoDB is reachable.
+
+        Within the TTL window the cached ping result is reused, backed by the
+        driver's topology description (no network round-trip). Once the
+        window expires a real ping is issued and the cache is refreshed.
+
+        Returns:
+            (healthy, error_message_or_None)
+        """
+        global _last_ping_ts, _last_ping_ok, _last_ping_error
+
+        now = time.monotonic()
+        cache_fresh = _last_ping_ts is not None and now - _last_ping_ts < _HEALTH_CHECK_TTL_SECONDS
+        # A cached success says nothing once the client is gone (e.g. closed)
+        if cache_fresh and not (_last_ping_ok and Database.client is None):
+            if _last_ping_ok and not Database.client.topology_description.has_writable_server():
+                return False, "no writable server"
+            return _last_ping_ok, _last_ping_error
+
+        if Database.client is None:
+            # Reconnect through the locked path; a failure is cached like a
+            # failed ping so probes during an outage don't each retry
+            try:
+                Database.get_db()
+            except RuntimeError:
+                _last_ping_ok, _last_ping_error = False, "not initialized"
+                _last_ping_ts = now
+                return _last_ping_ok, _last_ping_error
+
+        try:
+            Database.client.admin.command('ping')
+            _last_ping_ok, _last_ping_error = True, None
+        except Exception as e:
+            _last_ping_ok, _last_ping_error = False, str(e)
+        _last_ping_ts = now
+        return _last_ping_ok, _last_ping_error
+
     @staticmethod
     def close():
         """Close MongoDB connection."""
@@ -109,8 +198,11 @@ class Collections:
     USAGE_METRICS = "usage_metrics"
     ALERTS = "alerts"
     BUDGETS = "budgets"
+    INGESTION_JOBS = "ingestion_jobs"
+    ANOMALY_JOBS = "anomaly_jobs"
 
 
+@lru_cache(maxsize=16)
 def get_collection(collection_name):
     """
     Get a specific collection from the database.
@@ -125,58 +217,107 @@ def get_collection(collection_name):
     return db[collection_name]
 
 
+# Indexes created by earlier versions of create_indexes() that are now redundant
+_LEGACY_CLOUD_COST_INDEXES = [
+    "provider_1",
+    "service_name_1",
+    "region_1",
+    "billing_period_1",
+    "usage_start_date_1",
+    "cost_1",
+    "_id_1_user_id_1_version_1",
+    "user_id_1_record_hash_1",
+    "user_id_1_upload_batch_id_1",
+]
+
+
 def create_indexes():
     """
     Create indexes for better query performance.
     Should be called once during application initialization.
+
+    Each collection's indexes are sent in a single createIndexes command
+    (one round-trip per collection instead of one per index).
     """
     try:
         db = Database.get_db()
-        
-        # Users collection indexes
-        db[Collections.USERS].create_index("email", unique=True)
-        db[Collections.USERS].create_index("created_at")
-        
-        # Cloud costs collection indexes
-        # Compound index for user_id + usage_start_date (most common query pattern)
-        db[Collections.CLOUD_COSTS].create_index([
-            ("user_id", 1),
-            ("usage_start_date", -1)
-        ])
-        # Individual indexes for filtering
-        db[Collections.CLOUD_COSTS].create_index("provider")
-        db[Collections.CLOUD_COSTS].create_index("service_name")
-        db[Collections.CLOUD_COSTS].create_index("region")
-        db[Collections.CLOUD_COSTS].create_index("billing_period")
-        db[Collections.CLOUD_COSTS].create_index("usage_start_date")
-        db[Collections.CLOUD_COSTS].create_index("cost")
-        
-        # Anomalies collection indexes
-        db[Collections.ANOMALIES].create_index([
-            ("user_id", 1),
-            ("detected_at", -1)
-        ])
-        db[Collections.ANOMALIES].create_index("severity")
-        db[Collections.ANOMALIES].create_index("status")
-        
-        # Usage metrics collection indexes
-        db[Collections.USAGE_METRICS].create_index([
-            ("user_id", 1),
-            ("timestamp", -1)
-        ])
-        
-        # Alerts collection indexes
-        db[Collections.ALERTS].create_index([
-            ("user_id", 1),
-            ("created_at", -1)
-        ])
-        db[Collections.ALERTS].create_index("is_read")
-        
-        # Budget collection indexes
-        db[Collections.BUDGETS].create_index([
-            ("user_id", 1),
-            ("created_at", -1)
-        ])
+
+        index_specs = {
+            # Users collection indexes
+            Collections.USERS: [
+                IndexModel("email", unique=True),
+                IndexModel("created_at"),
+            ],
+            # Cloud costs collection indexes
+            Collections.CLOUD_COSTS: [
+                # Compound index for user_id + usage_start_date (most common query pattern).
+                # Every cost query is scoped by user_id, so this also covers date-range
+                # filters and no standalone usage_start_date index is needed.
+                IndexModel([("user_id", 1), ("usage_start_date", -1)]),
+                # Provider/service drill-downs over a date range
+                IndexModel([
+                    ("user_id", 1),
+                    ("provider", 1),
+                    ("service_name", 1),
+                    ("usage_start_date", -1)
+                ]),
+                # Monthly rollups grouped by billing period
+                IndexModel([("user_id", 1), ("billing_period", 1)]),
+                # Service / region / account filters and summary groupings
+                IndexModel([("user_id", 1), ("service_name", 1)]),
+                IndexModel([("user_id", 1), ("region", 1)]),
+                IndexModel([("user_id", 1), ("cloud_account_id", 1)]),
+                # Supports sort_by=cost&sort_order=desc in get_costs
+                IndexModel([("user_id", 1), ("cost", -1)]),
+            ],
+            # Anomalies collection indexes
+            Collections.ANOMALIES: [
+                IndexModel([("user_id", 1), ("detected_at", -1)]),
+                IndexModel("severity"),
+                IndexModel("status"),
+            ],
+            # Usage metrics collection indexes
+            Collections.USAGE_METRICS: [
+                IndexModel([("user_id", 1), ("timestamp", -1)]),
+            ],
+            # Alerts collection indexes
+            Collections.ALERTS: [
+                IndexModel([("user_id", 1), ("created_at", -1)]),
+                IndexModel("is_read"),
+            ],
+            # Budget collection indexes
+            Collections.BUDGETS: [
+                IndexModel([("user_id", 1), ("created_at", -1)]),
+            ],
+            # Background upload jobs; finished jobs are purged after a day
+            Collections.INGESTION_JOBS: [
+                IndexModel([("user_id", 1), ("created_at", -1)]),
+                IndexModel("created_at", expireAfterSeconds=86400),
+            ],
+            Collections.ANOMALY_JOBS: [
+                # One queued/running detection per user
+                IndexModel(
+                    "user_id",
+                    unique=True,
+                    partialFilterExpression={"active": True}
+                ),
+                # Jobs (including ones orphaned by a worker restart) expire an
+                # hour after their last update
+                IndexModel("updated_at", expireAfterSeconds=3600),
+            ],
+        }
+
+        for collection_name, indexes in index_specs.items():
+            db[collection_name].create_indexes(indexes)
+
+        # Indexes superseded by the user-scoped compound ones above, or whose
+        # only reader was removed. Dropping them saves a write per insert and
+        # keeps the working set small.
+        for index_name in _LEGACY_CLOUD_COST_INDEXES:
+            try:
+                db[Collections.CLOUD_COSTS].drop_index(index_name)
+            except OperationFailure:
+                pass  # already dropped or never created
 
         return True
         
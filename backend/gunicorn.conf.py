@@ -0,0 +1,52 @@
+"""
+Gunicorn configuration for production deployments.
+
+Run from the backend directory:
+    gunicorn "app:create_app()"
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+
+# 'gthread' (default) or 'gevent'. gevent lets one worker keep hundreds of
+# Mongo/JWT-bound requests in flight, but CPU-heavy forecast/anomaly calls
+# block every other greenlet in that worker while they run.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+if worker_class == 'gevent':
+    # Must patch before the app (and pymongo/ssl) is imported by preload_app
+    from gevent import monkey
+    monkey.patch_all()
+    # The larger gevent Mongo pool default is applied in config.py, after
+    # .env is loaded, so an explicit MONGODB_MAX_POOL_SIZE still wins.
+
+# Import the app once in the master so workers share the loaded modules
+# copy-on-write instead of each re-importing every blueprint.
+preload_app = True
+
+# Forecasting and anomaly detection can take a while on large datasets.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+
+
+def post_fork(server, worker):
+    """MongoClient is not fork-safe; give each worker its own connection pool."""
+    from database import Database
+    Database.initialize()
+
+
+def when_ready(server):
+    """
+    The master only needed Mongo while preloading the app (ping, indexes).
+    Close its pool and monitor threads before workers fork; each worker
+    opens its own in post_fork.
+    """
+    from database import Database
+    if Database.client is not None:
+        Database.client.close()
+        Database.client = None
+        Database.db = None
@@ -0,0 +1,50 @@
+"""
+orjson-backed JSON provider for Flask.
+Replaces the stdlib json encoder used by jsonify/request.get_json.
+"""
+
+from decimal import Decimal
+
+import orjson
+from bson import Decimal128, ObjectId
+from flask.json.provider import JSONProvider, _default as _flask_default
+
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    """Handle types orjson doesn't serialize natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    # Monetary values stored as Decimal128 / Decimal keep their exact digits
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    # Falls back to Flask's handling (UUID, dataclasses, __html__)
+    return _flask_default(obj)
+
+
+def dumps_bytes(obj) -> bytes:
+    """Serialize obj to JSON bytes with the app's orjson settings."""
+    return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider that serializes with orjson and writes bytes directly."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps_bytes(obj),
+            mimetype=self.mimetype,
+        )
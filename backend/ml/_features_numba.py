@@ -0,0 +1,55 @@
+"""
+Numba kernel for the time-series features built in feature_engineering.
+Only imported when numba is installed; feature_engineering falls back to
+its NumPy implementation otherwise.
+"""
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def engineer_features(cost: np.ndarray, window: int, epsilon: float):
+    """
+    Compute lag_1, lag_7, rolling_mean_window, rolling_std_window,
+    cost_ratio_1 and cost_ratio_7 in a single pass over cost.
+
+    The rolling statistics cover the `window` values before each row
+    (i.e. a rolling window over lag_1). Each window's mean and variance are
+    computed two-pass from its values, as NumPy does, rather than from
+    running sums, which cancel catastrophically for large costs. A window
+    containing NaN yields NaN, matching pandas' default min_periods.
+    """
+    n = cost.shape[0]
+    lag_1 = np.full(n, np.nan)
+    lag_7 = np.full(n, np.nan)
+    rolling_mean = np.full(n, np.nan)
+    rolling_std = np.full(n, np.nan)
+    ratio_1 = np.empty(n)
+    ratio_7 = np.empty(n)
+
+    for i in range(n):
+        if i >= 1:
+            lag_1[i] = cost[i - 1]
+        if i >= 7:
+            lag_7[i] = cost[i - 7]
+
+        # Window is cost[i - window : i] (lag_1 values ending at row i)
+        if i >= window:
+            total = 0.0
+            for j in range(i - window, i):
+                total += cost[j]
+            # NaN propagates through the sum
+            if not np.isnan(total):
+                mean = total / window
+                sq_dev = 0.0
+                for j in range(i - window, i):
+                    d = cost[j] - mean
+                    sq_dev += d * d
+                rolling_mean[i] = mean
+                rolling_std[i] = np.sqrt(sq_dev / (window - 1))
+
+        ratio_1[i] = cost[i] / (lag_1[i] + epsilon)
+        ratio_7[i] = cost[i] / (rolling_mean[i] + epsilon)
+
+    return lag_1, lag_7, rolling_mean, rolling_std, ratio_1, ratio_7
@@ -6,8 +6,30 @@ Single source of truth for mapping cloud service names to
 infrastructure categories: Compute, Storage, Database, Networking, Other.
 """
 
+import atexit
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from array import array
+from functools import lru_cache
 from typing import Dict
 
+# Optional multi-pattern matcher; falls back to a packed keyword trie.
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# POSIX file locking for the on-disk cache (skipped where unavailable)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
 # ---------------------------------------------------------------------------
 # Canonical keyword-to-category rules (checked via case-insensitive substring)
 # Order matters: first match wins, so more specific patterns come first.
@@ -150,8 +172,199 @@ _CANONICAL_CATEGORY_LABELS: Dict[str, str] = {
     "other": "Other",
 }
 
-# Runtime cache for substring matches
-_CACHE: Dict[str, str] = {}
+
+def _build_automaton():
+    """
+    Compile _KEYWORD_RULES into an Aho-Corasick automaton so a lookup walks
+    the key once instead of probing every keyword. Each keyword stores its
+    rule index so the lowest index (first rule) still wins.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for priority, (keyword, category) in enumerate(_KEYWORD_RULES):
+        if keyword not in automaton:
+            automaton.add_word(keyword, (priority, category))
+    automaton.make_automaton()
+    return automaton
+
+
+_AUTOMATON = _build_automaton()
+
+def _build_packed_trie():
+    """
+    Fallback when pyahocorasick is unavailable: a keyword trie packed into
+    flat int arrays. Node n's child for character code c lives at
+    children[n * width + c] (0 = no child), and accepting[n] holds the lowest
+    rule index ending at n (-1 if none). Codes cover only characters that
+    appear in keywords; code 0 means "not in any keyword".
+    """
+    char_codes = {
+        char: code
+        for code, char in enumerate(sorted({c for keyword, _ in _KEYWORD_RULES for c in keyword}), start=1)
+    }
+    width = len(char_codes) + 1
+
+    node_children = [{}]
+    accepting = [-1]
+    for priority, (keyword, _) in enumerate(_KEYWORD_RULES):
+        node = 0
+        for char in keyword:
+            child = node_children[node].get(char)
+            if child is None:
+                child = len(node_children)
+                node_children[node][char] = child
+                node_children.append({})
+                accepting.append(-1)
+            node = child
+        if accepting[node] == -1:
+            accepting[node] = priority
+
+    children = array('i', [0]) * (len(node_children) * width)
+    for node, edges in enumerate(node_children):
+        for char, child in edges.items():
+            children[node * width + char_codes[char]] = child
+
+    return char_codes, width, children, array('i', accepting)
+
+
+_TRIE_CHAR_CODES, _TRIE_WIDTH, _TRIE_CHILDREN, _TRIE_ACCEPTING = _build_packed_trie()
+
+
+def _match_packed_trie(key: str) -> str:
+    """Walk the packed trie from every offset of key, keeping the lowest rule index."""
+    codes = [_TRIE_CHAR_CODES.get(char, 0) for char in key]
+    best = len(_KEYWORD_RULES)
+    for start in range(len(codes)):
+        node = 0
+        for code in codes[start:]:
+            if not code:
+                break
+            node = _TRIE_CHILDREN[node * _TRIE_WIDTH + code]
+            if not node:
+                break
+            priority = _TRIE_ACCEPTING[node]
+            if priority != -1 and priority < best:
+                best = priority
+    return _KEYWORD_RULES[best][1] if best < len(_KEYWORD_RULES) else "Other"
+
+
+def _match_keyword_rules(key: str) -> str:
+    """Return the category of the first keyword rule found in key."""
+    if _AUTOMATON is not None:
+        best = None
+        for _, match in _AUTOMATON.iter(key):
+            if best is None or match[0] < best[0]:
+                best = match
+        return best[1] if best else "Other"
+
+    return _match_packed_trie(key)
+
+
+# ---------------------------------------------------------------------------
+# On-disk lookup cache
+# ---------------------------------------------------------------------------
+# Resolved keys are written to a JSON snapshot at exit and read back at
+# import, so restarted workers skip the rule scan for service names already
+# seen. The snapshot is tagged with a fingerprint of the rules and discarded
+# when they change. Only names that matched a rule are kept (unmatched,
+# arbitrary user-supplied names fall to "Other" cheaply anyway), and both
+# key length and entry count are capped.
+#
+# Every gunicorn worker exits with its own new entries, so writes go through
+# one function that takes an exclusive lock, merges with what is on disk and
+# replaces the file via a temp file; concurrent exits are serialized instead
+# of the last writer discarding everyone else's entries.
+
+_PERSISTED_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".category_cache.json"
+)
+_PERSISTED_CACHE_LOCK_PATH = _PERSISTED_CACHE_PATH + ".lock"
+_PERSISTED_CACHE_MAX_ENTRIES = 5_000
+_PERSISTED_CACHE_MAX_KEY_LENGTH = 128
+_RULES_FINGERPRINT = hashlib.sha1(
+    repr((_KEYWORD_RULES, sorted(_CANONICAL_CATEGORY_LABELS.items()))).encode()
+).hexdigest()
+
+
+def _load_persisted_cache() -> Dict[str, str]:
+    """Read the snapshot, ignoring it if missing, unreadable or built from other rules."""
+    try:
+        with open(_PERSISTED_CACHE_PATH, "r", encoding="utf-8") as fh:
+            snapshot = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(snapshot, dict) or snapshot.get("rules") != _RULES_FINGERPRINT:
+        return {}
+    entries = snapshot.get("entries")
+    if not isinstance(entries, dict):
+        return {}
+    return {
+        key: category
+        for key, category in list(entries.items())[:_PERSISTED_CACHE_MAX_ENTRIES]
+        if isinstance(key, str) and isinstance(category, str)
+        and len(key) <= _PERSISTED_CACHE_MAX_KEY_LENGTH and category != "Other"
+    }
+
+
+_PERSISTED_CACHE: Dict[str, str] = _load_persisted_cache()
+_NEW_CACHE_ENTRIES: Dict[str, str] = {}
+
+
+def _save_persisted_cache() -> None:
+    """Merge this process's new lookups into the snapshot on disk."""
+    if not _NEW_CACHE_ENTRIES:
+        return
+    tmp_path = None
+    try:
+        with open(_PERSISTED_CACHE_LOCK_PATH, "a") as lock_fh:
+            if fcntl is not None:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX)
+            # Re-read under the lock: other workers may have written since import
+            entries = _load_persisted_cache()
+            for key, category in _NEW_CACHE_ENTRIES.items():
+                if len(entries) >= _PERSISTED_CACHE_MAX_ENTRIES:
+                    break
+                entries.setdefault(key, category)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(_PERSISTED_CACHE_PATH), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump({"rules": _RULES_FINGERPRINT, "entries": entries}, fh)
+            os.replace(tmp_path, _PERSISTED_CACHE_PATH)
+            tmp_path = None
+    except OSError as e:
+        logger.warning("Could not persist category cache: %s", e)
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+atexit.register(_save_persisted_cache)
+
+
+@lru_cache(maxsize=4096)
+def _lookup(key: str) -> str:
+    """Resolve an already stripped, lowercased service name (bounded LRU cache)."""
+    # 0. Canonical category labels from normalized ingestion should pass through.
+    if key in _CANONICAL_CATEGORY_LABELS:
+        return _CANONICAL_CATEGORY_LABELS[key]
+
+    # 1. Previously resolved (possibly by an earlier process)
+    category = _PERSISTED_CACHE.get(key)
+    if category is not None:
+        return category
+
+    # 2. Substring match against keyword rules ("Other" if none match)
+    category = _match_keyword_rules(key)
+    if (
+        category != "Other"
+        and len(key) <= _PERSISTED_CACHE_MAX_KEY_LENGTH
+        and len(_PERSISTED_CACHE) + len(_NEW_CACHE_ENTRIES) < _PERSISTED_CACHE_MAX_ENTRIES
+    ):
+        _NEW_CACHE_ENTRIES[key] = category
+    return category
 
 
 def map_service_to_category(service_name: str) -> str:
@@ -168,28 +381,7 @@ def map_service_to_category(service_name: str) -> str:
     Returns:
         Category string.
     """
-    if not service_name:
-        return "Other"
-
-    key = service_name.strip().lower()
-
-    # 0. Canonical category labels from normalized ingestion should pass through.
-    if key in _CANONICAL_CATEGORY_LABELS:
-        return _CANONICAL_CATEGORY_LABELS[key]
-
-    # 1. Check exact cache first
-    if key in _CACHE:
-        return _CACHE[key]
-
-    # 2. Substring match against keyword rules
-    for keyword, category in _KEYWORD_RULES:
-        if keyword in key:
-            _CACHE[key] = category
-            return category
-
-    # 3. No match
-    _CACHE[key] = "Other"
-    return "Other"
+    return _lookup(service_name.strip().lower()) if service_name else "Other"
 
 
 # ---------------------------------------------------------------------------
@@ -5,6 +5,60 @@ Provides reusable functions for creating time-series features.
 
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Optional JIT kernel; the NumPy implementation below is used without numba
+try:
+    from ml._features_numba import engineer_features as _engineer_features_jit
+except ImportError:
+    _engineer_features_jit = None
+
+ROLLING_WINDOW = 7
+EPSILON = 1e-5
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    """NumPy equivalent of Series.shift(periods) for a float array."""
+    shifted = np.full(len(values), np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+
+def _compute_features(cost: np.ndarray) -> tuple:
+    """
+    Compute the engineered feature arrays for a date-sorted cost array.
+    Features are computed on one contiguous float array rather than
+    through a chain of Series.shift/rolling calls.
+    """
+    if _engineer_features_jit is not None:
+        return _engineer_features_jit(np.ascontiguousarray(cost), ROLLING_WINDOW, EPSILON)
+    
+    # 1. Lags
+    lag_1 = _shift(cost, 1)
+    lag_7 = _shift(cost, 7)
+    
+    # 2. Rolling Statistics (window=7 on shifted data for NO LEAKAGE)
+    # We use lag_1 so rolling_mean for today is based on yesterday backwards
+    rolling_mean_7 = np.full(len(cost), np.nan)
+    rolling_std_7 = np.full(len(cost), np.nan)
+    if len(cost) >= ROLLING_WINDOW:
+        windows = sliding_window_view(lag_1, ROLLING_WINDOW)
+        rolling_mean_7[ROLLING_WINDOW - 1:] = windows.mean(axis=1)
+        rolling_std_7[ROLLING_WINDOW - 1:] = windows.std(axis=1, ddof=1)
+    
+    # 3. Relative Features (Ratios)
+    cost_ratio_1 = cost / (lag_1 + EPSILON)
+    cost_ratio_7 = cost / (rolling_mean_7 + EPSILON)
+    
+    return lag_1, lag_7, rolling_mean_7, rolling_std_7, cost_ratio_1, cost_ratio_7
+
+
+def warm_up_feature_kernel() -> None:
+    """Trigger JIT compilation up front so the first real call doesn't pay for it."""
+    if _engineer_features_jit is not None:
+        _engineer_features_jit(np.zeros(ROLLING_WINDOW + 1), ROLLING_WINDOW, EPSILON)
+
 
 def create_time_series_features(df: pd.DataFrame, cost_col: str = 'cost', date_col: str = 'date') -> pd.DataFrame:
     """
@@ -23,28 +77,27 @@ def create_time_series_features(df: pd.DataFrame, cost_col: str = 'cost', date_c
         df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
     
     # Sort by date
-    df = df.sort_values(date_col).copy()
+    # (sort_values already returns a new frame, so no extra copy is needed)
+    df = df.sort_values(date_col, ignore_index=True)
     
-    # 1. Lags
-    df['lag_1'] = df[cost_col].shift(1)
-    df['lag_7'] = df[cost_col].shift(7)
-    
-    # 2. Rolling Statistics (window=7 on shifted data for NO LEAKAGE)
-    # We use shift(1) so rolling_mean for today is based on yesterday backwards
-    df['rolling_mean_7'] = df[cost_col].shift(1).rolling(window=7).mean()
-    df['rolling_std_7'] = df[cost_col].shift(1).rolling(window=7).std()
-    
-    # 3. Relative Features (Ratios)
-    epsilon = 1e-5
-    df['cost_ratio_1'] = df[cost_col] / (df['lag_1'] + epsilon)
-    df['cost_ratio_7'] = df[cost_col] / (df['rolling_mean_7'] + epsilon)
+    cost = df[cost_col].to_numpy(dtype=np.float64)
+    lag_1, lag_7, rolling_mean_7, rolling_std_7, cost_ratio_1, cost_ratio_7 = _compute_features(cost)
+    # Engineered columns are stored as float32 to match the training matrix
+    df = df.assign(
+        lag_1=lag_1.astype(np.float32),
+        lag_7=lag_7.astype(np.float32),
+        rolling_mean_7=rolling_mean_7.astype(np.float32),
+        rolling_std_7=rolling_std_7.astype(np.float32),
+        cost_ratio_1=cost_ratio_1.astype(np.float32),
+        cost_ratio_7=cost_ratio_7.astype(np.float32),
+    )
     
     # 4. Temporal Features
     df['day_of_week'] = df[date_col].dt.dayofweek
-    df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    df['is_weekend'] = (df['day_of_week'] >= 5).astype('int8')
     
     # 5. Drop NaN values created by lags and rolling windows
-    df = df.dropna().copy()
+    df = df.dropna()
     
     return df
 
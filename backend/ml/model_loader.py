@@ -4,13 +4,58 @@ Provides functions to load trained models and scalers.
 """
 
 import os
+import threading
 import joblib
 import logging
+from typing import Dict, Tuple
 
 # Define model path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODELS_DIR = os.path.join(BASE_DIR, 'models')
 
+
+class _SafeCharTable(dict):
+    """str.translate table mapping non-alphanumeric characters to '_', filled lazily per code point."""
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        replacement = char if char.isalnum() else "_"
+        self[codepoint] = replacement
+        return replacement
+
+
+_SAFE_CHAR_TABLE = _SafeCharTable()
+
+
+def safe_model_name(name: str) -> str:
+    """Sanitize a service or category name for use in model file names."""
+    return name.translate(_SAFE_CHAR_TABLE)
+
+
+# Artifacts are written uncompressed with pickle protocol 5 (see
+# save_model_artifacts / train_models) so they can be loaded memory-mapped.
+# Deserialized artifacts keyed by path, with the file mtime they were loaded at.
+# Retraining rewrites the file, which bumps the mtime and forces a reload.
+_ARTIFACT_CACHE: Dict[str, Tuple[float, object]] = {}
+_ARTIFACT_CACHE_LOCK = threading.Lock()
+
+
+def _load_cached(path: str):
+    """Return the joblib artifact at path, reusing the in-process copy while the file is unchanged."""
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _ARTIFACT_CACHE_LOCK:
+        cached = _ARTIFACT_CACHE.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        artifact = joblib.load(path)
+        _ARTIFACT_CACHE[path] = (mtime, artifact)
+        return artifact
+
 def load_model(service_name: str, user_id: str = None):
     """
     Load saved Isolation Forest model for a specific service.
@@ -24,15 +69,16 @@ def load_model(service_name: str, user_id: str = None):
     """
     try:
         # Sanitize filename
-        safe_service = "".join([c if c.isalnum() else "_" for c in service_name])
+        safe_service = safe_model_name(service_name)
         candidates = []
         if user_id:
             candidates.append(os.path.join(MODELS_DIR, f"{user_id}_{safe_service}_model.pkl"))
         candidates.append(os.path.join(MODELS_DIR, f"{safe_service}_model.pkl"))
 
         for model_path in candidates:
-            if os.path.exists(model_path):
-                return joblib.load(model_path)
+            model = _load_cached(model_path)
+            if model is not None:
+                return model
         return None
     except Exception as e:
         logging.error(f"Error loading model for {service_name}: {e}")
@@ -51,15 +97,16 @@ def load_scaler(service_name: str, user_id: str = None):
     """
     try:
         # Sanitize filename
-        safe_service = "".join([c if c.isalnum() else "_" for c in service_name])
+        safe_service = safe_model_name(service_name)
         candidates = []
         if user_id:
             candidates.append(os.path.join(MODELS_DIR, f"{user_id}_{safe_service}_scaler.pkl"))
         candidates.append(os.path.join(MODELS_DIR, f"{safe_service}_scaler.pkl"))
 
         for scaler_path in candidates:
-            if os.path.exists(scaler_path):
-                return joblib.load(scaler_path)
+            scaler = _load_cached(scaler_path)
+            if scaler is not None:
+                return scaler
         return None
     except Exception as e:
         logging.error(f"Error loading scaler for {service_name}: {e}")
@@ -79,15 +126,15 @@ def save_model_artifacts(model, scaler, service_name: str, user_id: str):
         os.makedirs(MODELS_DIR)
         
     try:
-        safe_service = "".join([c if c.isalnum() else "_" for c in service_name])
+        safe_service = safe_model_name(service_name)
         
         # Save Model
         model_path = os.path.join(MODELS_DIR, f"{user_id}_{safe_service}_model.pkl")
-        joblib.dump(model, model_path)
+        joblib.dump(model, model_path, compress=0, protocol=5)
         
         # Save Scaler
         scaler_path = os.path.join(MODELS_DIR, f"{user_id}_{safe_service}_scaler.pkl")
-        joblib.dump(scaler, scaler_path)
+        joblib.dump(scaler, scaler_path, compress=0, protocol=5)
         
         return True
     except Exception as e:
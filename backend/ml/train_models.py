@@ -8,9 +8,13 @@ import os
 import argparse
 import logging
 import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from typing import Tuple
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import joblib
 from sklearn.ensemble import IsolationForest 
 from sklearn.preprocessing import StandardScaler
@@ -19,8 +23,9 @@ from sklearn.preprocessing import StandardScaler
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
-from ml.feature_engineering import create_time_series_features
-from ml.category_mapper import SERVICE_CATEGORIES
+from ml.feature_engineering import create_time_series_features, warm_up_feature_kernel
+from ml.category_mapper import map_service_to_category
+from ml.model_loader import safe_model_name
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -28,6 +33,112 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 DATA_DIR = os.path.join(BASE_DIR, 'dataSet')
 MODELS_DIR = os.path.join(BASE_DIR, 'models')
 
+# Above this many date x category cells, fall back to a regular groupby
+_DENSE_GRID_MAX_CELLS = 5_000_000
+
+
+def _sum_cost_by_date_and_category(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Equivalent of df.groupby(['date', 'category'])['cost'].sum().reset_index().
+    With only a handful of categories, a scatter-add into a dense
+    date x category grid avoids the general groupby machinery; only cells
+    that actually had rows are emitted, sorted by date then category.
+    """
+    date_codes, dates = pd.factorize(df['date'], sort=True)
+    category_codes, categories = pd.factorize(df['category'], sort=True)
+    n_cells = len(dates) * len(categories)
+    
+    if n_cells > _DENSE_GRID_MAX_CELLS:
+        return df.groupby(['date', 'category'], observed=True)['cost'].sum().reset_index()
+    
+    # Rows with a missing key are dropped, and NaN costs count as 0, as in groupby
+    valid = (date_codes >= 0) & (category_codes >= 0)
+    cells = date_codes[valid] * len(categories) + category_codes[valid]
+    costs = np.nan_to_num(df['cost'].to_numpy(dtype=np.float64)[valid])
+    
+    totals = np.bincount(cells, weights=costs, minlength=n_cells)
+    present = np.flatnonzero(np.bincount(cells, minlength=n_cells))
+    
+    return pd.DataFrame({
+        'date': dates[present // len(categories)],
+        'category': categories[present % len(categories)],
+        'cost': totals[present],
+    })
+
+
+def _dump_artifact(obj, path: str) -> None:
+    """Write a joblib artifact beside path and swap it in, so loaders never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        joblib.dump(obj, tmp_path, compress=0, protocol=5)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _train_category(category: str, sdf: pd.DataFrame) -> Tuple[int, str]:
+    """
+    Engineer features, fit and save the model and scaler for one category.
+    Runs in a worker process; returns (log level, message) for the parent to log.
+    """
+    try:
+        # 4. Feature Engineering
+        sdf = create_time_series_features(sdf, cost_col='cost', date_col='date')
+        
+        # 5. Split Data (Train on older than last 7 days)
+        max_date = sdf['date'].max()
+        split_date = max_date - timedelta(days=7)
+        train_df = sdf[sdf['date'] < split_date].copy()
+        
+        if len(train_df) < 10:
+            return logging.WARNING, f"Skipping {category}: Insufficient training data after split"
+            
+        # Feature Selection
+        feature_cols = [
+            'cost', 'lag_1', 'lag_7', 
+            'rolling_mean_7', 'rolling_std_7', 
+            'cost_ratio_1', 'cost_ratio_7', 'is_weekend'
+        ]
+        
+        # float32 is plenty for tree splits and halves memory traffic in the fit
+        X_train = train_df[feature_cols].to_numpy(dtype=np.float32)
+        
+        # 6. Normalize
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        
+        # 7. Train Model
+        # Use 5% contamination for robust anomaly threshold.
+        # With very small datasets floor at 2/n to guarantee >=1 outlier.
+        n_samples = len(X_train)
+        contamination = max(0.05, 2.0 / n_samples)
+        contamination = min(contamination, 0.15)  # cap at 15%
+        
+        clf = IsolationForest(
+            contamination=contamination, 
+            random_state=42, 
+            n_estimators=100,  # per-category series are short; 100 trees (sklearn's default) suffice
+            max_features=1.0,
+            n_jobs=1
+        )
+        clf.fit(X_train_scaled.astype(np.float32, copy=False))
+        
+        # 8. Save Model & Scaler (e.g. Compute_model.pkl)
+        safe_name = safe_model_name(category)
+        
+        model_path = os.path.join(MODELS_DIR, f"{safe_name}_model.pkl")
+        scaler_path = os.path.join(MODELS_DIR, f"{safe_name}_scaler.pkl")
+        
+        _dump_artifact(clf, model_path)
+        _dump_artifact(scaler, scaler_path)
+        
+        return logging.INFO, f" Successfully saved model for {category}"
+        
+    except Exception as e:
+        return logging.ERROR, f" Failed training for {category}: {e}"
+
+
 def train_and_save_models():
     """
     Train Isolation Forest models for all services using dataset files.
@@ -44,20 +155,26 @@ def train_and_save_models():
         logging.error(f"No CSV files found in {DATA_DIR}")
         return
 
-    df_list = []
+    # Parse with Arrow's multi-threaded CSV reader and build one DataFrame
+    # from the combined table instead of concatenating per-file frames.
+    tables = []
     for filename in all_files:
         try:
-            temp_df = pd.read_csv(filename)
-            df_list.append(temp_df)
+            tables.append(pacsv.read_csv(filename))
         except Exception as e:
             logging.error(f"Error reading {filename}: {e}")
             continue
             
-    if not df_list:
+    if not tables:
         logging.error("No data loaded.")
         return
 
-    full_df = pd.concat(df_list, ignore_index=True)
+    try:
+        full_df = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        # Exports whose column types can't be unified fall back to pandas
+        logging.warning(f"Falling back to pandas concat: {e}")
+        full_df = pd.concat([table.to_pandas() for table in tables], ignore_index=True)
     
     # 2. Preprocess & Map Columns for Multi-Cloud (Azure, AWS, GCP)
     # Define mappings for different providers
@@ -93,7 +210,7 @@ def train_and_save_models():
     if 'service' in full_df.columns:
         full_df['service'] = full_df['service'].astype(str).str.strip()
 
-    # SERVICE_CATEGORIES imported from services.cloud_cost_ingestion (single source of truth)
+    # Categories come from ml.category_mapper (single source of truth)
 
     # Check if we have the required columns
     required_cols = ['date', 'service', 'cost']
@@ -106,23 +223,29 @@ def train_and_save_models():
     # Keep only relevant columns
     full_df = full_df[required_cols].copy()
 
-    # Convert date
-    full_df['date'] = pd.to_datetime(full_df['date'], utc=True) # Use UTC for standardization
-    # Remove timezone info to simplify grouping
-    full_df['date'] = full_df['date'].dt.date
-    full_df['date'] = pd.to_datetime(full_df['date'])
+    # Convert date: standardize on UTC, drop timezone info to simplify grouping
+    # and truncate to midnight while staying in datetime64
+    full_df['date'] = pd.to_datetime(full_df['date'], utc=True).dt.tz_convert(None).dt.normalize()
     
     # Assign Category
-    # Use 'map' and fallback to 'Other' if the specific service name isn't found
-    full_df['category'] = full_df['service'].map(SERVICE_CATEGORIES).fillna('Other')
+    # Map each distinct service name once, then broadcast back to rows by code
+    service_codes, unique_services = pd.factorize(full_df['service'])
+    unique_categories = np.array([map_service_to_category(name) for name in unique_services], dtype=object)
+    full_df['category'] = unique_categories[service_codes]
     
     if 'category' not in full_df.columns:
          full_df['category'] = 'Other'
 
     # Group by date and CATEGORY
     # This aggregates costs from Azure VMs AND AWS EC2 into a single "Compute" bucket
-    full_df = full_df.groupby(['date', 'category'])['cost'].sum().reset_index()
+    full_df = _sum_cost_by_date_and_category(full_df)
+    
+    # Compile the feature kernel (if numba is available) before the loop
+    warm_up_feature_kernel()
     
+    # Categories are independent, so each one trains in its own worker process.
+    # Workers use a single-threaded IsolationForest to avoid oversubscribing cores.
+    jobs = []
     for category in full_df['category'].unique():
         sdf = full_df[full_df['category'] == category].sort_values('date').copy()
         
@@ -132,63 +255,16 @@ def train_and_save_models():
             continue
             
         logging.info(f"Training model for category: {category} ({len(sdf)} samples)")
-        
-        try:
-            # 4. Feature Engineering
-            sdf = create_time_series_features(sdf, cost_col='cost', date_col='date')
-            
-            # 5. Split Data (Train on older than last 7 days)
-            max_date = sdf['date'].max()
-            split_date = max_date - timedelta(days=7)
-            train_df = sdf[sdf['date'] < split_date].copy()
-            
-            if len(train_df) < 10:
-                logging.warning(f"Skipping {category}: Insufficient training data after split")
-                continue
-                
-            # Feature Selection
-            feature_cols = [
-                'cost', 'lag_1', 'lag_7', 
-                'rolling_mean_7', 'rolling_std_7', 
-                'cost_ratio_1', 'cost_ratio_7', 'is_weekend'
-            ]
-            
-            X_train = train_df[feature_cols].values
-            
-            # 6. Normalize
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            
-            # 7. Train Model
-            # Use 5% contamination for robust anomaly threshold.
-            # With very small datasets floor at 2/n to guarantee >=1 outlier.
-            n_samples = len(X_train)
-            contamination = max(0.05, 2.0 / n_samples)
-            contamination = min(contamination, 0.15)  # cap at 15%
-            
-            clf = IsolationForest(
-                contamination=contamination, 
-                random_state=42, 
-                n_estimators=200,
-                max_features=1.0,
-                n_jobs=-1
-            )
-            clf.fit(X_train_scaled)
-            
-            # 8. Save Model & Scaler (e.g. Compute_model.pkl)
-            safe_name = "".join([c if c.isalnum() else "_" for c in category])
-            
-            model_path = os.path.join(MODELS_DIR, f"{safe_name}_model.pkl")
-            scaler_path = os.path.join(MODELS_DIR, f"{safe_name}_scaler.pkl")
-            
-            joblib.dump(clf, model_path)
-            joblib.dump(scaler, scaler_path)
-            
-            logging.info(f" Successfully saved model for {category}")
-            
-        except Exception as e:
-            logging.error(f" Failed training for {category}: {e}")
-            continue
+        jobs.append((category, sdf))
+    
+    if not jobs:
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(_train_category, category, sdf) for category, sdf in jobs]
+        for future in as_completed(futures):
+            level, message = future.result()
+            logging.log(level, message)
 
 if __name__ == "__main__":
     train_and_save_models()
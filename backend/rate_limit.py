@@ -0,0 +1,16 @@
+"""
+Request rate limiting shared by the blueprints.
+Counters live in Config.RATELIMIT_STORAGE_URI; point it at Redis in
+production so every gunicorn worker enforces the same limits.
+"""
+
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+from config import Config
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=Config.RATELIMIT_STORAGE_URI,
+    strategy='moving-window',
+)
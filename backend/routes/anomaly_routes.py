@@ -2,58 +2,32 @@
 Anomaly Routes - REST API endpoints for anomaly detection
 """
 
-from flask import Blueprint, request, jsonify
-from functools import wraps
-import jwt
-from config import Config
-from services import anomaly_detector, user_service
+from flask import Blueprint, request, jsonify, g
+from routes.auth_helpers import require_auth
+from routes.query_args import flag, int_range, parse_query
 
 anomaly_routes = Blueprint('anomalies', __name__, url_prefix='/api/anomalies')
+anomaly_routes.before_request(require_auth)
 
-
-def token_required(f):
-    """Decorator to require valid JWT token for protected routes."""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'error': 'Invalid token format'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Authentication token is missing'}), 401
-        
-        try:
-            payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
-            current_user_id = payload['user_id']
-            
-            user = user_service.get_user_by_id(current_user_id)
-            if not user:
-                return jsonify({'error': 'User not found'}), 401
-            
-            return f(current_user_id, *args, **kwargs)
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Invalid token'}), 401
-        except Exception as e:
-            return jsonify({'error': f'Authentication error: {str(e)}'}), 401
-    
-    return decorated
+ANOMALY_LIST_QUERY = {
+    'status': (str, None),
+    'severity': (str, None),
+    'limit': (int_range(1, 200), 50),
+}
 
 
 @anomaly_routes.route('/detect', methods=['POST'])
-@token_required
-def run_detection(current_user_id):
+def run_detection():
     """
     Run anomaly detection for the user.
     
-    POST /api/anomalies/detect
+    POST /api/anomalies/detect[?background=true]
+    
+    With background=true the run is queued and the response is 202 with
+    {"success": true, "job_id": "...", "anomaly_job_status": "queued"};
+    poll GET /api/anomalies/jobs/{job_id} for the outcome. While a run for
+    the user is still queued or running, its job id is returned instead of
+    queuing another.
     
     Response:
     {
@@ -68,7 +42,18 @@ def run_detection(current_user_id):
         }
     }
     """
+    current_user_id = g.current_user_id
+    from services import anomaly_detector
+
     try:
+        if flag(request.args.get('background', '')):
+            job_id = anomaly_detector.submit_anomaly_detection(current_user_id)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'anomaly_job_status': 'queued'
+            }), 202
+        
         success, result = anomaly_detector.run_anomaly_detection_for_user(current_user_id)
         
         if not success:
@@ -83,9 +68,30 @@ def run_detection(current_user_id):
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 
+@anomaly_routes.route('/jobs/<job_id>', methods=['GET'])
+def get_detection_job(job_id):
+    """
+    Status of a background detection run.
+    
+    GET /api/anomalies/jobs/{job_id}
+    
+    Response:
+    {
+        "success": true,
+        "job": {"job_id": "...", "status": "queued" | "running" | "completed" | "failed", ...}
+    }
+    """
+    current_user_id = g.current_user_id
+    from services import anomaly_detector
+
+    job = anomaly_detector.get_anomaly_detection_job(current_user_id, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job}), 200
+
+
 @anomaly_routes.route('', methods=['GET'])
-@token_required
-def get_anomalies(current_user_id):
+def get_anomalies():
     """
     Get anomalies for the user.
     
@@ -103,15 +109,20 @@ def get_anomalies(current_user_id):
         "count": 15
     }
     """
+    current_user_id = g.current_user_id
+    from services import anomaly_detector
+
     try:
-        status = request.args.get('status')
-        severity = request.args.get('severity')
-        limit = int(request.args.get('limit', 50))
-        
-        if limit < 1 or limit > 200:
+        params, errors = parse_query(ANOMALY_LIST_QUERY)
+        if 'limit' in errors:
             return jsonify({'error': 'Limit must be between 1 and 200'}), 400
+        if errors:
+            return jsonify({'error': next(iter(errors.values()))}), 400
+        limit = params['limit']
         
-        success, result = anomaly_detector.get_user_anomalies(current_user_id, status, severity, limit)
+        success, result = anomaly_detector.get_user_anomalies(
+            current_user_id, params['status'], params['severity'], limit
+        )
         
         if not success:
             return jsonify({'error': result}), 400
@@ -121,15 +132,12 @@ def get_anomalies(current_user_id):
             **result
         }), 200
         
-    except ValueError:
-        return jsonify({'error': 'Invalid limit parameter'}), 400
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
 
 @anomaly_routes.route('/<anomaly_id>/status', methods=['PUT'])
-@token_required
-def update_status(current_user_id, anomaly_id):
+def update_status(anomaly_id):
     """
     Update anomaly status.
     
@@ -146,6 +154,9 @@ def update_status(current_user_id, anomaly_id):
         "message": "Anomaly status updated to acknowledged"
     }
     """
+    current_user_id = g.current_user_id
+    from services import anomaly_detector
+
     try:
         data = request.get_json()
         
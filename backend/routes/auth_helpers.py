@@ -0,0 +1,80 @@
+"""
+Shared helpers for authenticating API requests.
+"""
+
+import re
+from typing import Optional
+
+import jwt
+import orjson
+from flask import Response, current_app, g, request
+
+from services import user_service
+
+# "Bearer <token>" (scheme is case-insensitive, surrounding whitespace ignored)
+_BEARER_RE = re.compile(r'^\s*Bearer\s+(\S+)\s*$', re.IGNORECASE)
+
+
+def extract_bearer_token(auth_header: Optional[str]) -> Optional[str]:
+    """Return the token from an Authorization header, or None if it isn't a Bearer header."""
+    if not auth_header:
+        return None
+    match = _BEARER_RE.match(auth_header)
+    return match.group(1) if match else None
+
+
+# Fixed auth error bodies, serialized once at import. A fresh Response is
+# still built per request since after_request hooks (CORS) mutate headers.
+_ERR_INVALID_FORMAT = orjson.dumps({'error': 'Invalid token format. Use: Bearer <token>'})
+_ERR_TOKEN_MISSING = orjson.dumps({'error': 'Authentication token is missing'})
+_ERR_USER_NOT_FOUND = orjson.dumps({'error': 'User not found'})
+_ERR_TOKEN_EXPIRED = orjson.dumps({'error': 'Token has expired'})
+_ERR_INVALID_TOKEN = orjson.dumps({'error': 'Invalid token'})
+
+
+def _unauthorized(body):
+    """Build a 401 response from a pre-serialized JSON body."""
+    return Response(body, status=401, mimetype='application/json')
+
+
+def public(view):
+    """Mark a view on an authenticated blueprint as not requiring a token."""
+    view.is_public = True
+    return view
+
+
+def require_auth():
+    """
+    before_request hook for blueprints whose routes need a logged-in user.
+
+    Verifies the bearer token (a single cache lookup for tokens seen in the
+    last minute) and stores the caller's id in g.current_user_id, or
+    returns a 401 response. CORS preflights and @public views are let through.
+    """
+    if request.method == 'OPTIONS':
+        return None
+
+    view = current_app.view_functions.get(request.endpoint)
+    if view is None or getattr(view, 'is_public', False):
+        return None
+
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return _unauthorized(_ERR_TOKEN_MISSING)
+
+    token = extract_bearer_token(auth_header)
+    if not token:
+        return _unauthorized(_ERR_INVALID_FORMAT)
+
+    try:
+        current_user_id = user_service.authenticate_token(token)
+    except jwt.ExpiredSignatureError:
+        return _unauthorized(_ERR_TOKEN_EXPIRED)
+    except jwt.InvalidTokenError:
+        return _unauthorized(_ERR_INVALID_TOKEN)
+
+    if current_user_id is None:
+        return _unauthorized(_ERR_USER_NOT_FOUND)
+
+    g.current_user_id = current_user_id
+    return None
@@ -5,6 +5,10 @@ Handles user registration, login, and token verification
 
 from flask import Blueprint, jsonify, request
 import logging
+from routes.auth_helpers import extract_bearer_token
+from routes.http_cache import etag_jsonify
+from config import Config
+from rate_limit import limiter
 from services.user_service import (
     create_user,
     authenticate_user,
@@ -20,6 +24,7 @@ logger = logging.getLogger(__name__)
 
 
 @auth_routes.route('/register', methods=['POST'])
+@limiter.limit(Config.AUTH_RATE_LIMIT, methods=['POST'])
 def register():
     """
     Register a new user.
@@ -71,6 +76,7 @@ def register():
 
 
 @auth_routes.route('/login', methods=['POST'])
+@limiter.limit(Config.AUTH_RATE_LIMIT, methods=['POST'])
 def login():
     """
     Login user.
@@ -171,12 +177,10 @@ def verify():
             return jsonify({'error': 'No token provided'}), 401
         
         # Extract token from "Bearer <token>"
-        parts = auth_header.split()
-        if len(parts) != 2 or parts[0].lower() != 'bearer':
+        token = extract_bearer_token(auth_header)
+        if not token:
             return jsonify({'error': 'Invalid token format'}), 401
         
-        token = parts[1]
-        
         # Verify token
         success, result = verify_token(token)
         
@@ -207,21 +211,20 @@ def get_current_user():
         if not auth_header:
             return jsonify({'error': 'No token provided'}), 401
         
-        parts = auth_header.split()
-        if len(parts) != 2 or parts[0].lower() != 'bearer':
+        # Extract token from "Bearer <token>"
+        token = extract_bearer_token(auth_header)
+        if not token:
             return jsonify({'error': 'Invalid token format'}), 401
         
-        token = parts[1]
-        
         # Verify token
         success, result = verify_token(token)
         
         if not success:
             return jsonify({'error': result}), 401
         
-        return jsonify({
+        return etag_jsonify({
             'user': result
-        }), 200
+        })
     
     except Exception as e:
         return jsonify({
@@ -237,10 +240,10 @@ def list_users():
     """
     try:
         users = get_all_users()
-        return jsonify({
+        return etag_jsonify({
             'users': users,
             'count': len(users)
-        }), 200
+        })
     
     except Exception as e:
         return jsonify({
@@ -303,7 +306,7 @@ def validate_email_endpoint():
                 'error': error
             }), 200
         
-        if email_exists(email):
+        if email_exists(email, cached=True):
             return jsonify({
                 'valid': False,
                 'error': 'Email already registered'
@@ -1,93 +1,52 @@
-from flask import Blueprint, request, jsonify
-from functools import wraps
-import jwt
-import logging
-from config import Config
+from bson import ObjectId
+from flask import Blueprint, request, jsonify, g
+from routes.auth_helpers import require_auth
+from routes.http_cache import etag_jsonify
 from services.budget_service import BudgetService
-from services import user_service
 
 budget_routes = Blueprint('budgets', __name__, url_prefix='/api/budgets')
-logger = logging.getLogger(__name__)
+budget_routes.before_request(require_auth)
+
+# Unexpected errors propagate to the app-wide handler, which logs them and
+# returns a generic 500.
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            parts = auth_header.split()
-            if len(parts) != 2 or parts[0].lower() != 'bearer':
-                return jsonify({'error': 'Invalid token format. Use: Bearer <token>'}), 401
-            token = parts[1]
-        if not token:
-            return jsonify({'error': 'Authentication token is missing'}), 401
-        try:
-            payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
-            current_user_id = payload['user_id']
-            user = user_service.get_user_by_id(current_user_id)
-            if not user:
-                return jsonify({'error': 'User not found'}), 401
-            return f(current_user_id, *args, **kwargs)
-        except Exception as e:
-            return jsonify({'error': f'Authentication error: {str(e)}'}), 401
-    return decorated
 
 @budget_routes.route('', methods=['POST'])
-@token_required
-def create_budget(current_user_id):
+def create_budget():
     """Create a new budget."""
+    current_user_id = g.current_user_id
+    data = request.get_json(silent=True) or {}
+    if not data.get('name') or not data.get('amount'):
+        return jsonify({'error': 'Name and amount are required'}), 400
+
     try:
-        data = request.get_json()
-        if not data.get('name') or not data.get('amount'):
-            return jsonify({'error': 'Name and amount are required'}), 400
-            
         budget = BudgetService.create_budget(current_user_id, data)
-        return jsonify(budget), 201
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(budget), 201
 
 @budget_routes.route('', methods=['GET'])
-@token_required
-def list_budgets(current_user_id):
+def list_budgets():
     """List all budgets with their current status."""
-    try:
-        budgets = BudgetService.get_budgets(current_user_id)
-        
-        # Enhance with current tracking data
-        enhanced_budgets = []
-        for b in budgets:
-            try:
-                # Get tracking details for each (can be optimized later)
-                status = BudgetService.track_budget(current_user_id, b['_id'])
-                enhanced_budgets.append(status)
-            except Exception as e:
-                logger.warning("Error tracking budget %s: %s", b.get('_id'), e)
-                enhanced_budgets.append({"budget": b, "error": "Failed to track"})
-                
-        return jsonify(enhanced_budgets), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    current_user_id = g.current_user_id
+    # One budgets query + one aggregated spend query for all budgets
+    return etag_jsonify(BudgetService.track_budgets_bulk(current_user_id))
 
 @budget_routes.route('/<budget_id>', methods=['GET'])
-@token_required
-def get_budget_details(current_user_id, budget_id):
+def get_budget_details(budget_id):
     """Get detailed status of a specific budget."""
-    try:
-        status = BudgetService.track_budget(current_user_id, budget_id)
-        if status.get('error'):
-            return jsonify(status), 404
-        return jsonify(status), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    current_user_id = g.current_user_id
+    if not ObjectId.is_valid(budget_id):
+        return jsonify({'error': 'Budget not found'}), 404
+    status = BudgetService.track_budget(current_user_id, budget_id)
+    if status.get('error'):
+        return jsonify(status), 404
+    return etag_jsonify(status)
 
 @budget_routes.route('/<budget_id>', methods=['DELETE'])
-@token_required
-def delete_budget(current_user_id, budget_id):
+def delete_budget(budget_id):
     """Delete a budget."""
-    try:
-        success = BudgetService.delete_budget(current_user_id, budget_id)
-        if success:
-            return jsonify({'message': 'Budget deleted successfully'}), 200
-        return jsonify({'error': 'Budget not found'}), 404
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    current_user_id = g.current_user_id
+    if ObjectId.is_valid(budget_id) and BudgetService.delete_budget(current_user_id, budget_id):
+        return jsonify({'message': 'Budget deleted successfully'}), 200
+    return jsonify({'error': 'Budget not found'}), 404
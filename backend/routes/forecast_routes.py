@@ -2,56 +2,61 @@
 Forecast Routes - REST API endpoints for future cost prediction
 """
 
-from flask import Blueprint, request, jsonify
-from functools import wraps
-import jwt
-from config import Config
-from services import forecast_service, user_service
+from datetime import datetime, timezone
+
+from flask import Blueprint, jsonify, g
+from routes.auth_helpers import require_auth
+from routes.http_cache import not_modified, tag_response, version_etag
+from routes.query_args import flag, int_range, parse_query
 
 forecast_routes = Blueprint('forecasts', __name__, url_prefix='/api/forecasts')
+forecast_routes.before_request(require_auth)
 
+# Query params passed through to the forecast service as filters
+FORECAST_FILTER_PARAMS = ('service', 'region', 'environment', 'resource_group')
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        auth_header = request.headers.get('Authorization', '')
-        parts = auth_header.split()
-        if len(parts) != 2 or parts[0].lower() != 'bearer':
-            return jsonify({'error': 'Invalid token format. Use: Bearer <token>'}), 401
-        token = parts[1]
-        try:
-            payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
-            current_user_id = payload['user_id']
-            user = user_service.get_user_by_id(current_user_id)
-            if not user:
-                return jsonify({'error': 'User not found'}), 401
-            return f(current_user_id, *args, **kwargs)
-        except Exception as e:
-            return jsonify({'error': f'Authentication error: {str(e)}'}), 401
-    return decorated
+FORECAST_QUERY = {
+    'days': (int_range(1, 365), 30),
+    'granularity': (str, 'daily'),
+    'detailed': (flag, False),
+    **{key: (str, None) for key in FORECAST_FILTER_PARAMS},
+}
 
 
 @forecast_routes.route('', methods=['GET'])
-@token_required
-def get_forecast(current_user_id):
+def get_forecast():
     """
     Get cost forecast for the user.
     GET /api/forecasts?days=30&granularity=daily&detailed=true&service=X&env=Y
     """
+    current_user_id = g.current_user_id
+    params, errors = parse_query(FORECAST_QUERY)
+    if errors:
+        return jsonify({'error': next(iter(errors.values()))}), 400
+
+    from services.cost_service import get_cost_data_version
+
+    # Forecasts depend only on the user's costs and today's date; a matching
+    # ETag skips the model fit entirely.
+    etag = version_etag(
+        current_user_id,
+        get_cost_data_version(current_user_id),
+        datetime.now(timezone.utc).date().isoformat(),
+    )
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    # Prophet/pandas are slow to import; defer until a forecast is requested.
+    from services import forecast_service
+
     try:
-        days_ahead = request.args.get('days', 30, type=int)
-        granularity = request.args.get('granularity', 'daily')
-        detailed_view = request.args.get('detailed', 'false').lower() == 'true'
+        days_ahead = params['days']
+        granularity = params['granularity']
+        detailed_view = params['detailed']
         
-        filters = {}
-        if request.args.get('service'):
-            filters['service'] = request.args.get('service')
-        if request.args.get('region'):
-            filters['region'] = request.args.get('region')
-        if request.args.get('environment'):
-            filters['environment'] = request.args.get('environment')
-        if request.args.get('resource_group'):
-            filters['resource_group'] = request.args.get('resource_group')
+        # Non-empty filter params
+        filters = {key: params[key] for key in FORECAST_FILTER_PARAMS if params[key]}
             
         if detailed_view:
             result = forecast_service.get_detailed_forecast(
@@ -72,7 +77,7 @@ def get_forecast(current_user_id):
             # Return 400 with error message but don't crash
             return jsonify({'error': result['error']}), 400
         
-        return jsonify(result), 200
+        return tag_response(jsonify(result), etag), 200
         
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
@@ -0,0 +1,64 @@
+"""
+Conditional GET support for read endpoints that clients poll.
+"""
+
+import hashlib
+from typing import Optional
+
+from flask import Response, request
+
+from json_provider import dumps_bytes
+
+
+def _etag_matches(etag: str) -> bool:
+    """
+    True if If-None-Match names etag. Flask-Compress appends ':<algorithm>'
+    to the ETag of compressed responses, so those variants match too.
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.contains_weak(etag):
+        return True
+    return any(tag.split(':', 1)[0] == etag for tag in if_none_match.as_set(include_weak=True))
+
+
+def version_etag(*parts) -> str:
+    """
+    ETag derived from what the response depends on (e.g. user id and data
+    version) plus the request path and query, without building the payload.
+    """
+    key = ':'.join(str(part) for part in parts) + ':' + request.full_path
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def not_modified(etag: str) -> Optional[Response]:
+    """An empty 304 if If-None-Match already names etag, else None."""
+    if not _etag_matches(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def tag_response(response: Response, etag: str) -> Response:
+    """Attach a version ETag that clients must revalidate on every use."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
+
+
+def etag_jsonify(payload, status: int = 200) -> Response:
+    """
+    JSON response tagged with a content ETag.
+
+    Returns an empty 304 when the request's If-None-Match already names the
+    current payload, so unchanged data isn't sent again on every poll.
+    """
+    body = dumps_bytes(payload)
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    if status == 200 and _etag_matches(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, status=status, mimetype='application/json')
+    response.set_etag(etag)
+    return response
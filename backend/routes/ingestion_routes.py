@@ -3,43 +3,70 @@ Ingestion Routes – REST API endpoints for multi-cloud cost ingestion.
 Supports both CSP API connectivity and CSV file upload.
 """
 
+import itertools
 import os
 import tempfile
 import logging
 from datetime import datetime
-from flask import Blueprint, request, jsonify
-from functools import wraps
-import jwt
-import pandas as pd
-from config import Config
-from services import user_service
-from services.cloud_cost_ingestion import fetch_cloud_cost_data
+from flask import Blueprint, request, jsonify, g
+from routes.auth_helpers import public, require_auth
+from routes.query_args import flag
 from ml.category_mapper import SERVICE_CATEGORIES
-from services.anomaly_detector import detect_anomalies_from_dataframe
-from services.cost_service import bulk_ingest_costs
+from services.cost_service import bulk_ingest_costs_chunked
+from services.timeparse import parse_iso
 
 logger = logging.getLogger(__name__)
 
 ingestion_routes = Blueprint("ingestion", __name__, url_prefix="/api/ingestion")
+ingestion_routes.before_request(require_auth)
 
 
-def _persist_normalized_costs(user_id: str, result_df):
+_PROVIDER_MAP = {"aws": "AWS", "azure": "Azure", "gcp": "GCP"}
+
+
+def _is_missing(val) -> bool:
+    """None or a float NaN (how pandas fills gaps in object columns)."""
+    return val is None or (isinstance(val, float) and val != val)
+
+
+def _clean_str(val, default=""):
+    """Safely extract a string field, handling None/NaN values."""
+    return default if _is_missing(val) else str(val).strip()
+
+
+def _clean_float(val, default=0.0):
+    """Safely extract a float field, handling None/NaN values."""
+    if _is_missing(val):
+        return default
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return default
+
+
+def _clean_dict(val):
+    """Safely extract a dict field, handling None/NaN values."""
+    return val if isinstance(val, dict) else {}
+
+
+def _iter_normalized_records(result_df, parse_errors):
     """
-    Persist normalized ingestion rows into cloud_costs using existing service validation.
-    Handles null/None values gracefully and validates all required fields.
+    Yield cost records for the rows of a normalized ingestion DataFrame,
+    appending {row, field, error} to parse_errors for rows that are skipped.
     """
-    if result_df is None or result_df.empty:
-        return True, {
-            "total_records": 0,
-            "success_count": 0,
-            "error_count": 0,
-            "errors": []
-        }
-    
-    records = []
-    parse_errors = []
-    
-    for row_index, row in result_df.iterrows():
+    import pandas as pd
+
+    metadata = {
+        "source": "ingestion",
+        "aggregation": "category_daily",
+        "ingested_at": datetime.utcnow().isoformat()
+    }
+
+    # Plain dicts instead of iterrows(), built lazily (no per-row Series,
+    # no up-front list of every row)
+    columns = list(result_df.columns)
+    rows = (dict(zip(columns, values)) for values in result_df.itertuples(index=False, name=None))
+    for row_index, row in zip(result_df.index, rows):
         try:
             # Parse and validate date
             row_date = row.get("date")
@@ -53,7 +80,7 @@ def _persist_normalized_costs(user_id: str, result_df):
                 continue
             elif isinstance(row_date, str):
                 try:
-                    row_date = datetime.fromisoformat(row_date.replace('Z', '+00:00'))
+                    row_date = parse_iso(row_date)
                 except Exception:
                     parse_errors.append({"row": int(row_index), "field": "date", "error": "Invalid date format"})
                     continue
@@ -75,75 +102,31 @@ def _persist_normalized_costs(user_id: str, result_df):
             # Extract and normalize provider
             provider_val = row.get("provider")
             if provider_val is None or pd.isna(provider_val):
-                provider_val = "Other"
+                normalized_provider = "Other"
             else:
-                provider_val = str(provider_val).strip().lower()
-            
-            provider_map = {"aws": "AWS", "azure": "Azure", "gcp": "GCP"}
-            normalized_provider = provider_map.get(provider_val, "Other")
+                normalized_provider = _PROVIDER_MAP.get(str(provider_val).strip().lower(), "Other")
 
             # Extract category/service name - must not be empty
             category_val = row.get("category")
             if category_val is None or pd.isna(category_val):
                 service_name = "Other"
             else:
-                service_name = str(category_val).strip()
-                if not service_name:
-                    service_name = "Other"
-
-            # Safe extraction of optional fields
-            def safe_get_str(field_name, default=""):
-                """Safely extract a string field, handling None/NaN values."""
-                val = row.get(field_name)
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return default
-                return str(val).strip() if val is not None else default
-
-            def safe_get_float(field_name, default=0.0):
-                """Safely extract a float field, handling None/NaN values."""
-                val = row.get(field_name)
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return default
-                try:
-                    return float(val)
-                except (TypeError, ValueError):
-                    return default
-
-            def safe_get_dict(field_name, default=None):
-                """Safely extract a dict field, handling None/NaN values."""
-                val = row.get(field_name)
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return default if default is not None else {}
-                if isinstance(val, dict):
-                    return val
-                return default if default is not None else {}
-
-            # Build record with safe field extraction
-            region = safe_get_str("region", "global")
-            account_id = safe_get_str("account_id", "")
-            usage_unit = safe_get_str("usage_unit", "")
-            currency = safe_get_str("currency", "USD")
-            usage_quantity = safe_get_float("usage_quantity", 0.0)
-            tags = safe_get_dict("tags", {})
-
-            records.append({
+                service_name = str(category_val).strip() or "Other"
+
+            yield {
                 "provider": normalized_provider,
                 "service_name": service_name,
                 "cost": normalized_cost,
                 "usage_start_date": row_date,
                 "usage_end_date": row_date,
-                "region": region,
-                "currency": currency,
-                "cloud_account_id": account_id,
-                "usage_quantity": usage_quantity,
-                "usage_unit": usage_unit,
-                "tags": tags,
-                "metadata": {
-                    "source": "ingestion",
-                    "aggregation": "category_daily",
-                    "ingested_at": datetime.utcnow().isoformat()
-                }
-            })
+                "region": _clean_str(row.get("region"), "global"),
+                "currency": _clean_str(row.get("currency"), "USD"),
+                "cloud_account_id": _clean_str(row.get("account_id")),
+                "usage_quantity": _clean_float(row.get("usage_quantity")),
+                "usage_unit": _clean_str(row.get("usage_unit")),
+                "tags": _clean_dict(row.get("tags")),
+                "metadata": dict(metadata)
+            }
 
         except Exception as e:
             parse_errors.append({
@@ -151,10 +134,28 @@ def _persist_normalized_costs(user_id: str, result_df):
                 "field": "row",
                 "error": f"Row processing failed: {str(e)}"
             })
-            logger.exception(f"Error processing row {row_index}")
+            logger.exception("Error processing row %s", row_index)
             continue
 
-    if not records:
+
+def _persist_normalized_costs(user_id: str, result_df):
+    """
+    Persist normalized ingestion rows into cloud_costs using existing service validation.
+    Handles null/None values gracefully and validates all required fields.
+    """
+    if result_df is None or result_df.empty:
+        return True, {
+            "total_records": 0,
+            "success_count": 0,
+            "error_count": 0,
+            "errors": []
+        }
+    
+    parse_errors = []
+    records = _iter_normalized_records(result_df, parse_errors)
+    first_record = next(records, None)
+
+    if first_record is None:
         return True, {
             "total_records": 0,
             "success_count": 0,
@@ -162,62 +163,26 @@ def _persist_normalized_costs(user_id: str, result_df):
             "errors": parse_errors[:10]
         }
 
-    total_records = len(records)
-    total_success = 0
-    total_errors = len(parse_errors)
-    merged_errors = list(parse_errors)
-
-    for start in range(0, total_records, 1000):
-        chunk = records[start:start + 1000]
-        ok, chunk_result = bulk_ingest_costs(user_id, chunk)
-        if not ok:
-            return False, {
-                "error": chunk_result.get("error", "Bulk ingestion failed")
-            }
-
-        total_success += chunk_result.get("success_count", 0)
-        total_errors += chunk_result.get("error_count", 0)
-        chunk_errors = chunk_result.get("errors", [])
-        if chunk_errors:
-            merged_errors.extend(chunk_errors)
+    # Records are built as the service consumes them, one chunk at a time,
+    # and inserted concurrently through the service's validation
+    ok, ingest_result = bulk_ingest_costs_chunked(user_id, itertools.chain((first_record,), records))
+    if not ok:
+        return False, {
+            "error": ingest_result.get("error", "Bulk ingestion failed")
+        }
 
     return True, {
-        "total_records": total_records,
-        "success_count": total_success,
-        "error_count": total_errors,
-        "errors": merged_errors[:10]
+        "total_records": ingest_result["total_records"],
+        "success_count": ingest_result["success_count"],
+        "error_count": len(parse_errors) + ingest_result["error_count"],
+        "inserted_ids": ingest_result["inserted_ids"],
+        "errors": (parse_errors + ingest_result["errors"])[:10]
     }
 
 
-# ── Auth decorator (same pattern as cost_routes) ─────────────────────────
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if "Authorization" in request.headers:
-            try:
-                token = request.headers["Authorization"].split(" ")[1]
-            except IndexError:
-                return jsonify({"error": "Invalid token format"}), 401
-        if not token:
-            return jsonify({"error": "Token missing"}), 401
-        try:
-            payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
-            user = user_service.get_user_by_id(payload["user_id"])
-            if not user:
-                return jsonify({"error": "User not found"}), 401
-            return f(payload["user_id"], *args, **kwargs)
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
-    return decorated
-
-
 # ── POST /api/ingestion/api – fetch from CSP API ─────────────────────────
 @ingestion_routes.route("/api", methods=["POST"])
-@token_required
-def ingest_from_api(current_user_id):
+def ingest_from_api():
     """
     Fetch billing data from a cloud provider API.
 
@@ -229,7 +194,10 @@ def ingest_from_api(current_user_id):
         "end_date":   "2026-01-31"        // optional
     }
     """
-    data = request.get_json()
+    current_user_id = g.current_user_id
+    from services.cloud_cost_ingestion import fetch_cloud_cost_data
+
+    data = request.get_json(cache=False)
     if not data:
         return jsonify({"error": "No JSON body provided"}), 400
 
@@ -262,7 +230,7 @@ def ingest_from_api(current_user_id):
         return jsonify({"error": ingest_result.get("error", "Failed to persist ingested data")}), 500
 
     # Log successful ingestion
-    logger.info(f"API ingestion completed: {ingest_result['success_count']} records inserted, {ingest_result['error_count']} errors")
+    logger.info("API ingestion completed: %d records inserted, %d errors", ingest_result['success_count'], ingest_result['error_count'])
     
     # result is a normalised DataFrame
     summary = {
@@ -284,83 +252,139 @@ def ingest_from_api(current_user_id):
     return jsonify({"success": True, "summary": summary}), 200
 
 
-# ── POST /api/ingestion/file – upload CSV file ───────────────────────────
-@ingestion_routes.route("/file", methods=["POST"])
-@token_required
-def ingest_from_file(current_user_id):
+def _ingest_saved_file(user_id: str, provider: str, file_path: str):
     """
-    Upload a billing CSV file from Azure / AWS / GCP.
-
-    Multipart form fields:
-        provider : "azure" | "aws" | "gcp"
-        file     : the CSV file
+    Parse a saved billing file, persist its rows and summarise the result.
+    Removes the file when done. Returns (http_status, response_body).
     """
-    provider = request.form.get("provider")
-    if not provider:
-        return jsonify({"error": "provider form field is required"}), 400
+    from services.cloud_cost_ingestion import fetch_cloud_cost_data
 
-    if "file" not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
-
-    uploaded = request.files["file"]
-    if uploaded.filename == "":
-        return jsonify({"error": "Empty filename"}), 400
-
-    # Save to a temp file so _parse_file can read it
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
     try:
-        uploaded.save(tmp.name)
-        tmp.close()
-
         success, result = fetch_cloud_cost_data(
             source_type="file",
             provider=provider,
-            file_path=tmp.name,
+            file_path=file_path,
         )
     finally:
         # Clean up temp file
-        if os.path.exists(tmp.name):
-            os.unlink(tmp.name)
+        if os.path.exists(file_path):
+            os.unlink(file_path)
 
     if not success:
-        return jsonify({"error": result}), 400
+        return 400, {"error": result}
 
     if result is None or result.empty:
-        return jsonify({"error": "No data returned from file"}), 400
+        return 400, {"error": "No data returned from file"}
 
-    ingest_ok, ingest_result = _persist_normalized_costs(current_user_id, result)
+    ingest_ok, ingest_result = _persist_normalized_costs(user_id, result)
     if not ingest_ok:
-        return jsonify({"error": ingest_result.get("error", "Failed to persist ingested data")}), 500
+        return 500, {"error": ingest_result.get("error", "Failed to persist ingested data")}
 
     # Log successful ingestion
-    logger.info(f"File ingestion completed: {ingest_result['success_count']} records inserted, {ingest_result['error_count']} errors")
+    logger.info("File ingestion completed: %d records inserted, %d errors", ingest_result['success_count'], ingest_result['error_count'])
     
     summary = {
-        "rows_ingest": len(result) if result is not None else 0,
-        "categories": result["category"].unique().tolist() if result is not None and len(result) > 0 else [],
+        "rows_ingest": len(result),
+        "categories": result["category"].unique().tolist(),
         "date_range": {
-            "from": str(result["date"].min().date()) if result is not None and len(result) > 0 else "N/A",
-            "to": str(result["date"].max().date()) if result is not None and len(result) > 0 else "N/A",
+            "from": str(result["date"].min().date()),
+            "to": str(result["date"].max().date()),
         },
-        "total_cost": round(float(result["cost"].sum()), 2) if result is not None and len(result) > 0 else 0,
+        "total_cost": round(float(result["cost"].sum()), 2),
         "database_insert": {
             "success_count": ingest_result["success_count"],
             "error_count": ingest_result["error_count"],
             "inserted_ids": ingest_result.get("inserted_ids", [])[:10]  # Show first 10
         },
-        "errors": ingest_result.get("errors", [])[:5] if ingest_result.get("errors") else []
+        "errors": ingest_result.get("errors", [])[:5]
     }
-    for rec in summary.get("data", []):
-        if "date" in rec:
-            rec["date"] = str(rec["date"].date()) if hasattr(rec["date"], "date") else str(rec["date"])
 
-    return jsonify({"success": True, "summary": summary}), 200
+    return 200, {"success": True, "summary": summary}
+
+
+def _upload_suffix(filename: str) -> str:
+    """Temp-file suffix for an upload: NDJSON keeps its extension, anything else is read as CSV."""
+    from services.cloud_cost_ingestion import NDJSON_EXTENSIONS
+
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext in NDJSON_EXTENSIONS else ".csv"
+
+
+# ── POST /api/ingestion/file – upload CSV / NDJSON file ──────────────────
+@ingestion_routes.route("/file", methods=["POST"])
+def ingest_from_file():
+    """
+    Upload a billing CSV file from Azure / AWS / GCP.
+
+    Multipart form fields:
+        provider : "azure" | "aws" | "gcp"
+        file     : the CSV file, or NDJSON (.ndjson / .jsonl, one row object
+                   per line, same column names as the CSV export)
+
+    With ?background=true the file is saved and queued, and the response is
+    202 with {"success": true, "job_id": "...", "status": "queued"}; poll
+    GET /api/ingestion/jobs/{job_id} for the summary.
+    """
+    current_user_id = g.current_user_id
+
+    provider = request.form.get("provider")
+    if not provider:
+        return jsonify({"error": "provider form field is required"}), 400
+
+    if "file" not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    uploaded = request.files["file"]
+    if uploaded.filename == "":
+        return jsonify({"error": "Empty filename"}), 400
+
+    # Save to a temp file so _parse_file can read it
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=_upload_suffix(uploaded.filename))
+    try:
+        uploaded.save(tmp.name)
+        tmp.close()
+    except Exception:
+        tmp.close()
+        os.unlink(tmp.name)
+        raise
+
+    if flag(request.args.get("background", "")):
+        from services.ingestion_jobs import submit_ingestion_job
+
+        def work():
+            status, body = _ingest_saved_file(current_user_id, provider, tmp.name)
+            return status == 200, body.get("summary", body)
+
+        job_id = submit_ingestion_job(current_user_id, uploaded.filename, work)
+        return jsonify({"success": True, "job_id": job_id, "status": "queued"}), 202
+
+    status, body = _ingest_saved_file(current_user_id, provider, tmp.name)
+    return jsonify(body), status
+
+
+# ── GET /api/ingestion/jobs/<job_id> – background upload status ──────────
+@ingestion_routes.route("/jobs/<job_id>", methods=["GET"])
+def get_ingestion_job_status(job_id):
+    """
+    Status of a background file ingestion.
+
+    Response:
+    {
+        "success": true,
+        "job": {"job_id": "...", "status": "queued" | "running" | "completed" | "failed", ...}
+    }
+    """
+    from services.ingestion_jobs import get_ingestion_job
+
+    job = get_ingestion_job(g.current_user_id, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"success": True, "job": job}), 200
 
 
 # ── POST /api/ingestion/detect – ingest + run anomaly detection ──────────
 @ingestion_routes.route("/detect", methods=["POST"])
-@token_required
-def ingest_and_detect(current_user_id):
+def ingest_and_detect():
     """
     Ingest data (API or file) then immediately run ML anomaly detection
     on the normalised result.
@@ -379,9 +403,16 @@ def ingest_and_detect(current_user_id):
         provider    : "azure"
         file        : <csv>
     """
+    current_user_id = g.current_user_id
+    from services.cloud_cost_ingestion import fetch_cloud_cost_data
+    from services.anomaly_detector import detect_anomalies_from_dataframe
+
+    # Parse a JSON body at most once; the raw bytes aren't kept around
+    # (cache=False) since nothing reads them again
+    body = {} if request.form else (request.get_json(silent=True, cache=False) or {})
     source_type = (
         request.form.get("source_type")
-        or (request.get_json() or {}).get("source_type", "")
+        or body.get("source_type", "")
     ).lower()
 
     if source_type == "file":
@@ -390,7 +421,7 @@ def ingest_and_detect(current_user_id):
             return jsonify({"error": "No file uploaded"}), 400
 
         uploaded = request.files["file"]
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=_upload_suffix(uploaded.filename))
         try:
             uploaded.save(tmp.name)
             tmp.close()
@@ -402,13 +433,12 @@ def ingest_and_detect(current_user_id):
                 os.unlink(tmp.name)
 
     elif source_type == "api":
-        data = request.get_json() or {}
         success, result = fetch_cloud_cost_data(
             source_type="api",
-            provider=data.get("provider", ""),
-            credentials=data.get("credentials"),
-            start_date=data.get("start_date"),
-            end_date=data.get("end_date"),
+            provider=body.get("provider", ""),
+            credentials=body.get("credentials"),
+            start_date=body.get("start_date"),
+            end_date=body.get("end_date"),
         )
     else:
         return jsonify({"error": "source_type must be 'api' or 'file'"}), 400
@@ -479,9 +509,9 @@ def ingest_and_detect(current_user_id):
             
             if anomaly_docs:
                 anomalies_col.insert_many(anomaly_docs)
-                logger.info(f"Stored {len(anomaly_docs)} NEW anomalies (deduped) for user {current_user_id}")
+                logger.info("Stored %d NEW anomalies (deduped) for user %s", len(anomaly_docs), current_user_id)
         except Exception as e:
-            logger.error(f"Failed to store anomalies: {e}")
+            logger.error("Failed to store anomalies: %s", e)
 
     return jsonify({
         "success": True,
@@ -504,6 +534,7 @@ def ingest_and_detect(current_user_id):
 
 # ── GET /api/ingestion/categories – list known categories ────────────────
 @ingestion_routes.route("/categories", methods=["GET"])
+@public
 def list_categories():
     """Return the full service-to-category mapping."""
     return jsonify({"categories": SERVICE_CATEGORIES}), 200
@@ -0,0 +1,78 @@
+"""
+Typed parsing of query-string parameters.
+
+A route declares its parameters once as {name: (coercer, default)} and
+parse_query reads them from request.args in a single pass, collecting every
+invalid value instead of stopping at the first.
+"""
+
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from flask import request
+
+
+def int_arg(value: str) -> int:
+    """Non-negative integer (digits only). Raises ValueError."""
+    if not (value.isascii() and value.isdigit()):
+        raise ValueError(value)
+    return int(value)
+
+
+def int_range(low: int, high: int) -> Callable[[str], int]:
+    """Coercer for an integer in [low, high], checked before any handler work."""
+    def coerce(value: str) -> int:
+        number = int_arg(value)
+        if not low <= number <= high:
+            raise ValueError(value)
+        return number
+
+    return coerce
+
+
+def one_of(*choices: str) -> Callable[[str], str]:
+    """Coercer accepting only the given values (case-insensitive, returned lowercase)."""
+    allowed = frozenset(choice.lower() for choice in choices)
+
+    def coerce(value: str) -> str:
+        value = value.lower()
+        if value not in allowed:
+            raise ValueError(value)
+        return value
+
+    return coerce
+
+
+def flag(value: str) -> bool:
+    """'true' (any case) is True, anything else False."""
+    return value.lower() == 'true'
+
+
+QuerySpec = Mapping[str, Tuple[Callable[[str], object], object]]
+
+
+def parse_query(spec: QuerySpec, args: Optional[Mapping[str, str]] = None) -> Tuple[Dict, Dict]:
+    """
+    Parse the parameters named in spec.
+
+    Missing or empty parameters take their default. Values the coercer
+    rejects (ValueError) are reported in errors as {name: message}.
+
+    Returns:
+        (parsed, errors)
+    """
+    if args is None:
+        args = request.args
+    get = args.get
+
+    parsed = {}
+    errors = {}
+    for name, (coerce, default) in spec.items():
+        raw = get(name)
+        if not raw:
+            parsed[name] = default
+            continue
+        try:
+            parsed[name] = coerce(raw)
+        except ValueError:
+            errors[name] = f'Invalid {name} parameter'
+    return parsed, errors
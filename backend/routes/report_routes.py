@@ -2,57 +2,24 @@
 Report Routes - API endpoints for generating and downloading reports
 """
 
-from flask import Blueprint, request, jsonify, make_response
-from functools import wraps
-import jwt
+from flask import Blueprint, jsonify, make_response, g
+from routes.auth_helpers import require_auth
+from routes.query_args import int_arg, one_of, parse_query
 from datetime import datetime
-from config import Config
-from services import user_service, report_service
+from services import report_service
 
 report_routes = Blueprint('reports', __name__, url_prefix='/api/reports')
+report_routes.before_request(require_auth)
 
-
-def token_required(f):
-    """Decorator to require valid JWT token for protected routes."""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        
-        # Get token from Authorization header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({'error': 'Invalid token format. Use: Bearer <token>'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Authentication token is missing'}), 401
-        
-        try:
-            # Decode token
-            payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
-            current_user_id = payload['user_id']
-            
-            # Verify user exists
-            user = user_service.get_user_by_id(current_user_id)
-            if not user:
-                return jsonify({'error': 'User not found'}), 401
-            
-            # Pass user_id to route function
-            return f(current_user_id, *args, **kwargs)
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Invalid token'}), 401
-    
-    return decorated
+REPORT_DOWNLOAD_QUERY = {
+    'format': (one_of('pdf', 'txt', 'csv'), 'pdf'),
+    'year': (int_arg, None),
+    'month': (int_arg, None),
+}
 
 
 @report_routes.route('/list', methods=['GET'])
-@token_required
-def list_reports(current_user_id):
+def list_reports():
     """
     List available reports for download.
     Returns metadata about available reports.
@@ -108,8 +75,7 @@ def list_reports(current_user_id):
 
 
 @report_routes.route('/download/<report_type>', methods=['GET'])
-@token_required
-def download_report(current_user_id, report_type):
+def download_report(report_type):
     """
     Download a specific report.
     
@@ -117,16 +83,20 @@ def download_report(current_user_id, report_type):
     - year: Year for monthly reports (optional)
     - month: Month for monthly reports (optional)
     """
+    current_user_id = g.current_user_id
     try:
-        fmt = request.args.get('format', 'pdf').lower()
-        if fmt not in ('pdf', 'txt', 'csv'):
+        params, errors = parse_query(REPORT_DOWNLOAD_QUERY)
+        if 'format' in errors:
             return jsonify({'success': False, 'error': 'Invalid format. Use pdf, txt, or csv'}), 400
+        if errors:
+            return jsonify({'success': False, 'error': next(iter(errors.values()))}), 400
+        fmt = params['format']
 
         # Generate report based on type
         if report_type == 'monthly_summary':
             # Get year and month from query params
-            year = request.args.get('year', type=int)
-            month = request.args.get('month', type=int)
+            year = params['year']
+            month = params['month']
             
             # Default to last month if not provided
             if not year or not month:
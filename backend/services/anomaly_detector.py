@@ -3,13 +3,17 @@ Anomaly Detection Service - ML-Based
 Detects anomalies using Pre-Trained Isolation Forest models (Category-based).
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
 import logging
+import uuid
 from typing import Dict, List, Tuple, Optional
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from database import get_collection, Collections
 from schemas import Anomaly
+from services.timeparse import parse_iso
 from services import user_service
 from services import email_service
 from ml.category_mapper import SERVICE_CATEGORIES, get_category
@@ -20,8 +24,8 @@ logger = logging.getLogger(__name__)
 try:
     import pandas as pd
     import numpy as np
-    import joblib
     from sklearn.ensemble import IsolationForest 
+    from ml.model_loader import load_model, load_scaler
     ML_AVAILABLE = True
 except ImportError as e:
     ML_AVAILABLE = False
@@ -33,6 +37,11 @@ MODELS_DIR = os.path.join(BASE_DIR, 'models')
 
 # SERVICE_CATEGORIES is imported from ml.category_mapper (single source of truth)
 
+# Background detection runs started by submit_anomaly_detection. Job state
+# lives in MongoDB (expiring an hour after its last update) so a status poll
+# answered by any gunicorn worker sees it.
+_detection_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='anomaly-detection')
+
 def delete_all_anomalies_for_user(user_id: str) -> bool:
     """Delete all anomalies for a user."""
     try:
@@ -71,7 +80,7 @@ def detect_anomalies_ml(user_id: str) -> List[Dict]:
             d_date = doc.get('usage_start_date')
             if isinstance(d_date, str):
                 try:
-                    d_date = datetime.fromisoformat(d_date.replace('Z', '+00:00'))
+                    d_date = parse_iso(d_date)
                 except:
                     continue
             if d_date is None:
@@ -108,22 +117,13 @@ def detect_anomalies_ml(user_id: str) -> List[Dict]:
         for service in df['service'].unique():
             # Get Category (uses shared mapping from cloud_cost_ingestion)
             category = get_category(service)
-            safe_category = "".join([c if c.isalnum() else "_" for c in category])
-            
-            # Load Model & Scaler
-            model_path = os.path.join(MODELS_DIR, f"{safe_category}_model.pkl")
-            scaler_path = os.path.join(MODELS_DIR, f"{safe_category}_scaler.pkl")
             
-            if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+            # Load Model & Scaler (cached per process by ml.model_loader)
+            clf = load_model(category)
+            scaler = load_scaler(category)
+            if clf is None or scaler is None:
                 # logger.warning(f"No model found for category: {category} (Service: {service})")
                 continue
-            
-            try:
-                clf = joblib.load(model_path)
-                scaler = joblib.load(scaler_path)
-            except Exception as e:
-                logger.error(f"Error loading model for {category}: {e}")
-                continue
 
             # Prepare data
             sdf = df[df['service'] == service].sort_values('date').copy()
@@ -163,11 +163,9 @@ def detect_anomalies_ml(user_id: str) -> List[Dict]:
                 
                 # ── Hybrid Rule: flag extreme spike deviations the model may miss ──
                 RATIO_SPIKE_THRESHOLD = 5.0    # cost > 5× the 7-day mean
-                for idx in sdf_clean.index:
-                    ratio = sdf_clean.at[idx, 'cost_ratio_7']
-                    if sdf_clean.at[idx, 'ano'] == 1:  # model said normal
-                        if ratio >= RATIO_SPIKE_THRESHOLD:
-                            sdf_clean.at[idx, 'ano'] = -1  # override to anomaly
+                # Override rows the model called normal (one vectorized mask)
+                spikes = (sdf_clean['ano'] == 1) & (sdf_clean['cost_ratio_7'] >= RATIO_SPIKE_THRESHOLD)
+                sdf_clean.loc[spikes, 'ano'] = -1
                 
                 # Check anomalies in the LAST 7 DAYS of the data (relative to latest date)
                 cutoff_date = latest_date - timedelta(days=7)
@@ -208,7 +206,7 @@ def detect_anomalies_ml(user_id: str) -> List[Dict]:
                     })
 
             except Exception as e:
-                logger.error(f"Prediction error for {service}: {e}")
+                logger.error("Prediction error for %s: %s", service, e)
                 continue
                 
         return anomalies
@@ -277,7 +275,7 @@ def run_anomaly_detection_for_user(user_id: str) -> Tuple[bool, any]:
             try:
                 _send_email_alerts(user_id, new_docs)
             except Exception as e:
-                logger.error(f"Email alert dispatch failed: {e}")
+                logger.error("Email alert dispatch failed: %s", e)
             
         return True, {
             "total_detected": len(ml_anomalies),
@@ -289,28 +287,107 @@ def run_anomaly_detection_for_user(user_id: str) -> Tuple[bool, any]:
         return False, f"Error: {str(e)}"
 
 
+def _set_job_state(job_id: str, **state) -> None:
+    update = {"$set": {**state, "updated_at": datetime.utcnow()}}
+    if state.get("status") in ("completed", "failed"):
+        update["$unset"] = {"active": ""}
+    get_collection(Collections.ANOMALY_JOBS).update_one({"_id": job_id}, update)
+
+
+def submit_anomaly_detection(user_id: str) -> str:
+    """
+    Queue run_anomaly_detection_for_user on the background pool.
+    Returns a job id whose progress get_anomaly_detection_job reports.
+    
+    A user has at most one queued or running job (enforced by a partial
+    unique index); asking again while one is pending returns its id.
+    """
+    jobs = get_collection(Collections.ANOMALY_JOBS)
+    job_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    try:
+        jobs.insert_one({
+            "_id": job_id,
+            "user_id": ObjectId(user_id),
+            "status": "queued",
+            "active": True,
+            "submitted_at": now.isoformat(),
+            "updated_at": now
+        })
+    except DuplicateKeyError:
+        pending = jobs.find_one({"user_id": ObjectId(user_id), "active": True}, {"_id": 1})
+        if pending is not None:
+            return pending["_id"]
+        # The pending job finished in between; queue a new one
+        return submit_anomaly_detection(user_id)
+
+    def _worker():
+        _set_job_state(job_id, status="running")
+        try:
+            success, result = run_anomaly_detection_for_user(user_id)
+        except Exception as e:
+            logger.exception("Background anomaly detection failed")
+            success, result = False, f"Error: {str(e)}"
+
+        if success:
+            _set_job_state(
+                job_id,
+                status="completed",
+                finished_at=datetime.utcnow().isoformat(),
+                result={
+                    "total_detected": result["total_detected"],
+                    "stored": result["stored"],
+                    "breakdown": result["breakdown"]
+                }
+            )
+        else:
+            _set_job_state(job_id, status="failed", finished_at=datetime.utcnow().isoformat(), error=result)
+
+    _detection_executor.submit(_worker)
+    return job_id
+
+
+def get_anomaly_detection_job(user_id: str, job_id: str) -> Optional[Dict]:
+    """State of a background detection job, or None if unknown to this user."""
+    job = get_collection(Collections.ANOMALY_JOBS).find_one(
+        {"_id": job_id, "user_id": ObjectId(user_id)},
+        {"user_id": 0, "active": 0, "updated_at": 0}
+    )
+    if job is None:
+        return None
+    job["job_id"] = job.pop("_id")
+    return job
+
+
+def _anomaly_list_query(user_id: str, status: Optional[str], severity: Optional[str]) -> Dict:
+    query = {
+        "user_id": ObjectId(user_id),
+        # Only return spikes: detected cost must exceed expected cost
+        "$expr": {"$gt": ["$detected_value", "$expected_value"]}
+    }
+    if status: query["status"] = status
+    if severity: query["severity"] = severity
+    return query
+
+
+def _serialize_anomaly(a: Dict) -> Dict:
+    a['_id'] = str(a['_id'])
+    a['user_id'] = str(a['user_id'])
+    a['cost_id'] = str(a.get('cost_id', ''))
+    a['detected_at'] = a['detected_at'].isoformat()
+    if a.get('acknowledged_at'): a['acknowledged_at'] = a['acknowledged_at'].isoformat()
+    if a.get('resolved_at'): a['resolved_at'] = a['resolved_at'].isoformat()
+    return a
+
+
 def get_user_anomalies(user_id: str, status: Optional[str] = None, severity: Optional[str] = None, limit: int = 50) -> Tuple[bool, any]:
     """Get anomalies."""
     try:
-        query = {
-            "user_id": ObjectId(user_id),
-            # Only return spikes: detected cost must exceed expected cost
-            "$expr": {"$gt": ["$detected_value", "$expected_value"]}
-        }
-        if status: query["status"] = status
-        if severity: query["severity"] = severity
-        
-        anomalies = list(get_collection(Collections.ANOMALIES).find(query).sort("detected_at", -1).limit(limit))
-        
-        # Serialize
-        for a in anomalies:
-            a['_id'] = str(a['_id'])
-            a['user_id'] = str(a['user_id'])
-            a['cost_id'] = str(a.get('cost_id', ''))
-            a['detected_at'] = a['detected_at'].isoformat()
-            if a.get('acknowledged_at'): a['acknowledged_at'] = a['acknowledged_at'].isoformat()
-            if a.get('resolved_at'): a['resolved_at'] = a['resolved_at'].isoformat()
-            
+        query = _anomaly_list_query(user_id, status, severity)
+        anomalies = [
+            _serialize_anomaly(a)
+            for a in get_collection(Collections.ANOMALIES).find(query).sort("detected_at", -1).limit(limit)
+        ]
         return True, {"anomalies": anomalies, "count": len(anomalies)}
     except Exception as e:
         return False, f"Error: {str(e)}"
@@ -358,18 +435,9 @@ def detect_anomalies_from_dataframe(ingested_df) -> List[Dict]:
     anomalies = []
 
     for category in df["category"].unique():
-        safe_category = "".join([c if c.isalnum() else "_" for c in category])
-        model_path = os.path.join(MODELS_DIR, f"{safe_category}_model.pkl")
-        scaler_path = os.path.join(MODELS_DIR, f"{safe_category}_scaler.pkl")
-
-        if not os.path.exists(model_path) or not os.path.exists(scaler_path):
-            continue
-
-        try:
-            clf = joblib.load(model_path)
-            scaler = joblib.load(scaler_path)
-        except Exception as e:
-            logger.error(f"Error loading model for {category}: {e}")
+        clf = load_model(category)
+        scaler = load_scaler(category)
+        if clf is None or scaler is None:
             continue
 
         sdf = df[df["category"] == category].sort_values("date").copy()
@@ -409,11 +477,12 @@ def detect_anomalies_from_dataframe(ingested_df) -> List[Dict]:
             # ── Hybrid Rule: flag extreme ratio deviations the model may miss ──
             RATIO_SPIKE_THRESHOLD = 5.0    # cost > 5× the 7-day mean
             RATIO_DROP_THRESHOLD  = 0.15   # cost < 15% of the 7-day mean
-            for idx in sdf_clean.index:
-                ratio = sdf_clean.at[idx, "cost_ratio_7"]
-                if sdf_clean.at[idx, "ano"] == 1:  # model said normal
-                    if ratio >= RATIO_SPIKE_THRESHOLD or ratio <= RATIO_DROP_THRESHOLD:
-                        sdf_clean.at[idx, "ano"] = -1  # override to anomaly
+            # Override rows the model called normal (one vectorized mask)
+            ratio = sdf_clean["cost_ratio_7"]
+            extreme = (sdf_clean["ano"] == 1) & (
+                (ratio >= RATIO_SPIKE_THRESHOLD) | (ratio <= RATIO_DROP_THRESHOLD)
+            )
+            sdf_clean.loc[extreme, "ano"] = -1
 
             cutoff_date = df["date"].max() - timedelta(days=7)
             recent_anomalies = sdf_clean[
@@ -454,7 +523,7 @@ def detect_anomalies_from_dataframe(ingested_df) -> List[Dict]:
                     "detected_at": row["date"].to_pydatetime(),
                 })
         except Exception as e:
-            logger.error(f"Prediction error for {category}: {e}")
+            logger.error("Prediction error for %s: %s", category, e)
             continue
 
     return anomalies
@@ -6,10 +6,12 @@ Integrates with Forecast Service to predict proactive breaches.
 
 from datetime import datetime, timedelta
 import calendar
+import logging
 from typing import Dict, List, Optional
 from bson import ObjectId
 from database import get_collection, Collections
-from services import forecast_service
+
+logger = logging.getLogger(__name__)
 
 class BudgetService:
     @staticmethod
@@ -66,23 +68,8 @@ class BudgetService:
         return result.deleted_count > 0
 
     @staticmethod
-    def track_budget(user_id: str, budget_id: str) -> Dict:
-        """
-        Calculates:
-        - Actual spend so far
-        - Forecasted total
-        - Alerts
-        """
-        budgets_collection = get_collection(Collections.BUDGETS)
-        budget = budgets_collection.find_one({"_id": ObjectId(budget_id), "user_id": ObjectId(user_id)})
-        
-        if not budget:
-            return {"error": "Budget not found"}
-
-        # Determine Date Range based on period
-        now = datetime.utcnow()
-        period = budget.get('period', 'monthly')
-        
+    def _period_window(period: str, now: datetime):
+        """Return (start_date, end_date, days_in_period, days_passed) for a budget period."""
         if period == 'monthly':
             start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             _, last_day = calendar.monthrange(now.year, now.month)
@@ -119,50 +106,46 @@ class BudgetService:
             days_in_period = last_day
             days_passed = now.day
         
-        days_remaining = days_in_period - days_passed
+        return start_date, end_date, days_in_period, days_passed
 
-        # 1. Calculate Actual Spend
-        costs_collection = get_collection(Collections.CLOUD_COSTS)
-        
-        match_query = {
-            "user_id": ObjectId(user_id),
-            "usage_start_date": {"$gte": start_date, "$lte": end_date}
-        }
-        
-        # Apply Scope
-        scope = budget.get('scope', {})
+    @staticmethod
+    def _scope_filter(scope: Dict) -> Dict:
+        """Cost query conditions for a budget scope."""
         if scope.get('type') == 'service':
-            match_query['service_name'] = scope.get('value')
+            return {'service_name': scope.get('value')}
         elif scope.get('type') == 'resource_group':
-             match_query['tags.resource_group'] = scope.get('value')
-        
-        pipeline = [
-            {"$match": match_query},
-            {"$group": {"_id": None, "total": {"$sum": "$cost"}}}
-        ]
+            return {'tags.resource_group': scope.get('value')}
+        return {}
+
+    @staticmethod
+    def _forecast_remaining(user_id: str, scope: Dict, days_remaining: int) -> float:
+        """Forecast spend for the remaining days of the period."""
+        # Only forecast if we have remaining days
+        if days_remaining <= 0:
+            return 0.0
+
+        from services import forecast_service
+
+        filters = {}
+        if scope.get('type') == 'service': filters['service'] = scope.get('value')
         
-        res = list(costs_collection.aggregate(pipeline))
-        actual_spend = res[0]['total'] if res else 0.0
+        # Use forecast service to predict remaining days
+        # We ask for 'days_remaining' prediction
+        fc_res = forecast_service.predict_future_costs(
+            user_id, 
+            periods_ahead=days_remaining, 
+            granularity='daily',
+            filters=filters
+        )
         
-        # 2. Forecast Future Spend (for remaining days)
-        forecasted_remaining = 0.0
-        # Only forecast if we have remaining days
-        if days_remaining > 0:
-            filters = {}
-            if scope.get('type') == 'service': filters['service'] = scope.get('value')
-            
-            # Use forecast service to predict remaining days
-            # We ask for 'days_remaining' prediction
-            fc_res = forecast_service.predict_future_costs(
-                user_id, 
-                periods_ahead=days_remaining, 
-                granularity='daily',
-                filters=filters
-            )
-            
-            if fc_res.get('success'):
-                forecasted_remaining = fc_res['total_predicted_cost']
+        if fc_res.get('success'):
+            return fc_res['total_predicted_cost']
+        return 0.0
 
+    @staticmethod
+    def _build_status(budget: Dict, actual_spend: float, forecasted_remaining: float,
+                      start_date: datetime, end_date: datetime, days_remaining: int) -> Dict:
+        """Turn spend figures for a budget into the tracking payload."""
         total_projected = actual_spend + forecasted_remaining
         amount = float(budget.get('amount') or 0)
         if amount <= 0:
@@ -215,4 +198,112 @@ class BudgetService:
             "alerts": alerts
         }
 
+    @staticmethod
+    def track_budget(user_id: str, budget_id: str) -> Dict:
+        """
+        Calculates:
+        - Actual spend so far
+        - Forecasted total
+        - Alerts
+        """
+        budgets_collection = get_collection(Collections.BUDGETS)
+        budget = budgets_collection.find_one({"_id": ObjectId(budget_id), "user_id": ObjectId(user_id)})
+        
+        if not budget:
+            return {"error": "Budget not found"}
+
+        # Determine Date Range based on period
+        start_date, end_date, days_in_period, days_passed = BudgetService._period_window(
+            budget.get('period', 'monthly'), datetime.utcnow()
+        )
+        days_remaining = days_in_period - days_passed
+
+        # 1. Calculate Actual Spend
+        costs_collection = get_collection(Collections.CLOUD_COSTS)
+        
+        scope = budget.get('scope', {})
+        match_query = {
+            "user_id": ObjectId(user_id),
+            "usage_start_date": {"$gte": start_date, "$lte": end_date},
+            **BudgetService._scope_filter(scope)
+        }
+        
+        pipeline = [
+            {"$match": match_query},
+            {"$group": {"_id": None, "total": {"$sum": "$cost"}}}
+        ]
+        
+        res = list(costs_collection.aggregate(pipeline))
+        actual_spend = res[0]['total'] if res else 0.0
+        
+        # 2. Forecast Future Spend (for remaining days)
+        forecasted_remaining = BudgetService._forecast_remaining(user_id, scope, days_remaining)
+
+        return BudgetService._build_status(budget, actual_spend, forecasted_remaining, start_date, end_date, days_remaining)
+
+    @staticmethod
+    def track_budgets_bulk(user_id: str) -> List[Dict]:
+        """
+        Track every budget of a user at once.
+        Uses one budgets query and one cost aggregation (a $facet branch per
+        budget) instead of a track_budget round trip per budget, and reuses
+        forecasts between budgets that need the same one.
+        """
+        user_oid = ObjectId(user_id)
+        budgets_collection = get_collection(Collections.BUDGETS)
+        budgets = list(budgets_collection.find({"user_id": user_oid}).sort("created_at", -1))
+        if not budgets:
+            return []
+
+        now = datetime.utcnow()
+        windows = [BudgetService._period_window(b.get('period', 'monthly'), now) for b in budgets]
+
+        # 1. Actual spend for every budget in a single round trip
+        facets = {}
+        for i, (budget, (start_date, end_date, _, _)) in enumerate(zip(budgets, windows)):
+            facets[str(i)] = [
+                {"$match": {
+                    "usage_start_date": {"$gte": start_date, "$lte": end_date},
+                    **BudgetService._scope_filter(budget.get('scope', {}))
+                }},
+                {"$group": {"_id": None, "total": {"$sum": "$cost"}}}
+            ]
+        pipeline = [
+            {"$match": {
+                "user_id": user_oid,
+                "usage_start_date": {
+                    "$gte": min(w[0] for w in windows),
+                    "$lte": max(w[1] for w in windows)
+                }
+            }},
+            {"$facet": facets}
+        ]
+        res = list(get_collection(Collections.CLOUD_COSTS).aggregate(pipeline))
+        spend_by_budget = res[0] if res else {}
+
+        # 2. Forecast + status per budget
+        forecasts = {}
+        results = []
+        for i, (budget, (start_date, end_date, days_in_period, days_passed)) in enumerate(zip(budgets, windows)):
+            try:
+                totals = spend_by_budget.get(str(i)) or []
+                actual_spend = totals[0]['total'] if totals else 0.0
+                days_remaining = days_in_period - days_passed
+
+                scope = budget.get('scope', {})
+                forecast_key = (scope.get('value') if scope.get('type') == 'service' else None, days_remaining)
+                if forecast_key not in forecasts:
+                    forecasts[forecast_key] = BudgetService._forecast_remaining(user_id, scope, days_remaining)
+
+                results.append(BudgetService._build_status(
+                    budget, actual_spend, forecasts[forecast_key], start_date, end_date, days_remaining
+                ))
+            except Exception as e:
+                logger.warning("Error tracking budget %s: %s", budget.get('_id'), e)
+                budget['_id'] = str(budget['_id'])
+                budget['user_id'] = str(budget['user_id'])
+                results.append({"budget": budget, "error": "Failed to track"})
+
+        return results
+
 budget_service = BudgetService()
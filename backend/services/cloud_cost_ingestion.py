@@ -11,8 +11,10 @@ import io
 import csv
 import logging
 from datetime import datetime, timedelta
+from itertools import chain
 from typing import Dict, List, Tuple, Optional, Any
 
+import orjson
 import pandas as pd
 import numpy as np
 
@@ -209,7 +211,7 @@ def _fetch_aws_api(credentials: Dict, start_date: str, end_date: str) -> pd.Data
         region_name="us-east-1",  # MANDATORY - Cost Explorer is a global service
     )
 
-    logger.info(f"AWS Cost Explorer: Fetching {start_date} to {end_date} (end is exclusive)")
+    logger.info("AWS Cost Explorer: Fetching %s to %s (end is exclusive)", start_date, end_date)
     
     # Try UNBLENDED_COST first (most common metric)
     try:
@@ -235,10 +237,10 @@ def _fetch_aws_api(credentials: Dict, start_date: str, end_date: str) -> pd.Data
             }
         )
         metric_used = "UNBLENDED_COST"
-        logger.info(f"AWS Cost Explorer: Got {len(response.get('ResultsByTime', []))} periods with UNBLENDED_COST")
+        logger.info("AWS Cost Explorer: Got %d periods with UNBLENDED_COST", len(response.get('ResultsByTime', [])))
         
     except Exception as e:
-        logger.warning(f"UNBLENDED_COST failed: {str(e)}, retrying with BLENDED_COST...")
+        logger.warning("UNBLENDED_COST failed: %s, retrying with BLENDED_COST...", e)
         try:
             # Fallback: Try BLENDED_COST
             response = ce.get_cost_and_usage(
@@ -257,10 +259,10 @@ def _fetch_aws_api(credentials: Dict, start_date: str, end_date: str) -> pd.Data
                 }
             )
             metric_used = "BLENDED_COST"
-            logger.info(f"AWS Cost Explorer: Got {len(response.get('ResultsByTime', []))} periods with BLENDED_COST")
+            logger.info("AWS Cost Explorer: Got %d periods with BLENDED_COST", len(response.get('ResultsByTime', [])))
             
         except Exception as e2:
-            logger.error(f"Both UNBLENDED_COST and BLENDED_COST failed: {str(e2)}")
+            logger.error("Both UNBLENDED_COST and BLENDED_COST failed: %s", e2)
             raise ValueError(
                 f"AWS Cost Explorer API failed with both metrics. Error: {str(e2)}. "
                 f"Verify: 1) Credentials valid, 2) Cost Explorer enabled (24hr wait), 3) Region us-east-1 works"
@@ -295,7 +297,7 @@ def _fetch_aws_api(credentials: Dict, start_date: str, end_date: str) -> pd.Data
         
         total_cost_from_api += day_total
         if day_total > 0:
-            logger.debug(f"  {day}: ${day_total:.2f}")
+            logger.debug("  %s: $%.2f", day, day_total)
 
     logger.info(
         f"AWS Cost Explorer: Fetched {len(records)} service records, "
@@ -407,10 +409,61 @@ def _resolve_column(df_columns: List[str], candidates: List[str]) -> Optional[st
     return None
 
 
+# Uploads with these extensions are read as newline-delimited JSON (one
+# billing row object per line); anything else is read as CSV.
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+
+
+def _map_file_columns(provider: str, header: List[str]) -> Dict[str, str]:
+    """Map source column -> unified name for each column the provider's spec needs."""
+    col_map = {}
+    for unified_name, candidates in _FILE_COLUMN_MAPS[provider].items():
+        src = _resolve_column(header, candidates)
+        if src is None:
+            raise ValueError(
+                f"Cannot find '{unified_name}' column for {provider}. "
+                f"Expected one of {candidates}. Found columns: {header}"
+            )
+        col_map[src] = unified_name
+    return col_map
+
+
+def _ndjson_records(fh):
+    """Yield one dict per non-blank line; malformed lines raise ValueError."""
+    for line_number, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}") from None
+        if not isinstance(row, dict):
+            raise ValueError(f"Line {line_number} is not a JSON object")
+        yield row
+
+
+def _read_ndjson_columns(provider: str, file_path: str) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    Decode an NDJSON export line by line, keeping only the mapped columns
+    of each row. Column names are taken from the first record.
+    """
+    with open(file_path, "rb") as fh:
+        records = _ndjson_records(fh)
+        first = next(records, None)
+        if first is None:
+            raise ValueError("NDJSON file is empty")
+
+        col_map = _map_file_columns(provider, list(first.keys()))
+        columns = list(col_map.keys())
+        data = [[row.get(col) for col in columns] for row in chain((first,), records)]
+
+    return pd.DataFrame(data, columns=columns), col_map
+
+
 def _parse_file(provider: str, file_path: str) -> pd.DataFrame:
     """
-    Read a billing CSV exported from a cloud console and map columns
-    to the unified schema: date | service | cost.
+    Read a billing export (CSV, or NDJSON for .ndjson/.jsonl files) from a
+    cloud console and map columns to the unified schema: date | service | cost.
     """
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
@@ -419,21 +472,18 @@ def _parse_file(provider: str, file_path: str) -> pd.DataFrame:
     if provider not in _FILE_COLUMN_MAPS:
         raise ValueError(f"Unsupported provider '{provider}'. Use: azure, aws, gcp")
 
-    mapping_spec = _FILE_COLUMN_MAPS[provider]
-
-    df = pd.read_csv(file_path)
-    if df.empty:
-        raise ValueError("CSV file is empty")
+    if file_path.lower().endswith(NDJSON_EXTENSIONS):
+        df, col_map = _read_ndjson_columns(provider, file_path)
+    else:
+        # Resolve columns from the header alone, then load only those columns.
+        # Billing exports often carry 50+ columns; skipping the rest keeps
+        # memory and parse time proportional to what we actually use.
+        header = list(pd.read_csv(file_path, nrows=0).columns)
+        col_map = _map_file_columns(provider, header)
 
-    col_map = {}
-    for unified_name, candidates in mapping_spec.items():
-        src = _resolve_column(list(df.columns), candidates)
-        if src is None:
-            raise ValueError(
-                f"Cannot find '{unified_name}' column for {provider}. "
-                f"Expected one of {candidates}. Found columns: {list(df.columns)}"
-            )
-        col_map[src] = unified_name
+        df = pd.read_csv(file_path, usecols=list(col_map.keys()))
+        if df.empty:
+            raise ValueError("CSV file is empty")
 
     df = df.rename(columns=col_map)
 
@@ -468,7 +518,7 @@ def normalize_and_aggregate(df: pd.DataFrame) -> pd.DataFrame:
         return pd.DataFrame(columns=["date", "category", "cost", "provider"])
 
     df = df.copy()
-    logger.info(f"normalize_and_aggregate: Starting with {len(df)} rows")
+    logger.info("normalize_and_aggregate: Starting with %d rows", len(df))
 
     # Ensure correct types
     if not pd.api.types.is_datetime64_any_dtype(df["date"]):
@@ -484,7 +534,8 @@ def normalize_and_aggregate(df: pd.DataFrame) -> pd.DataFrame:
 
     # Category mapping
     df["category"] = df["service"].map(SERVICE_CATEGORIES).fillna("Other")
-    logger.info(f"normalize_and_aggregate: Categories mapped - {df['category'].unique().tolist()}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("normalize_and_aggregate: Categories mapped - %s", df['category'].unique().tolist())
 
     # Aggregation – sum cost per (date, category, provider)
     agg_df = (
@@ -494,9 +545,9 @@ def normalize_and_aggregate(df: pd.DataFrame) -> pd.DataFrame:
         .reset_index(drop=True)
     )
     
-    logger.info(f"normalize_and_aggregate: After aggregation - {len(agg_df)} rows")
-    if len(agg_df) > 0:
-        logger.info(f"normalize_and_aggregate: Total cost = {agg_df['cost'].sum()}")
+    logger.info("normalize_and_aggregate: After aggregation - %d rows", len(agg_df))
+    if len(agg_df) > 0 and logger.isEnabledFor(logging.INFO):
+        logger.info("normalize_and_aggregate: Total cost = %s", agg_df['cost'].sum())
 
     return agg_df
 
@@ -607,7 +658,7 @@ def fetch_cloud_cost_data(
 
     # ── Validate fetched data ─────────────────────────────────────────────
     if raw_df is None or raw_df.empty:
-        logger.warning(f"No billing data returned for provider={provider}, date_range={start_date} to {end_date}")
+        logger.warning("No billing data returned for provider=%s, date_range=%s to %s", provider, start_date, end_date)
         if source_type == "api":
             return False, f"AWS returned no data. Check: 1) Credentials validity, 2) Cost Explorer enabled, 3) Account has costs in {start_date} to {end_date}"
         else:
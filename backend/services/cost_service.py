@@ -4,20 +4,179 @@ Production-quality service layer for cost management
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from functools import wraps
+from itertools import islice
+import base64
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import orjson
 from bson import ObjectId
+from pymongo import ReadPreference
+from pymongo.errors import BulkWriteError
+from cachetools import TTLCache
 from database import get_collection, Collections
 from config import Config
+from services.timeparse import parse_iso as _parse_iso
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 # Valid cloud providers
-VALID_PROVIDERS = ['AWS', 'Azure', 'GCP', 'Other']
+VALID_PROVIDERS = ('AWS', 'Azure', 'GCP', 'Other')
+# Lowercase name -> canonical casing
+_PROVIDER_BY_LOWER = {p.lower(): p for p in VALID_PROVIDERS}
 
 # Valid currencies
-VALID_CURRENCIES = ['USD', 'EUR', 'GBP', 'INR', 'JPY', 'CNY']
+VALID_CURRENCIES = frozenset(('USD', 'EUR', 'GBP', 'INR', 'JPY', 'CNY'))
+
+# Fields cost listings may be sorted by
+VALID_SORT_FIELDS = frozenset(('usage_start_date', 'usage_end_date', 'cost', 'service_name', 'provider', 'created_at'))
+
+# get_auto_trends breakdown_by -> grouped field
+_TREND_BREAKDOWN_FIELDS = {
+    'service': '$service_name',
+    'region': '$region',
+    'account': '$cloud_account_id',
+    'provider': '$provider'
+}
+# Response key -> cost field for get_filter_options (each backed by an index)
+_FILTER_OPTION_FIELDS = (
+    ("services", "service_name"),
+    ("regions", "region"),
+    ("accounts", "cloud_account_id"),
+    ("providers", "provider"),
+)
+
+# get_auto_trends month filter ('2026-01'; strptime's %m also takes '2026-1')
+_MONTH_RE = re.compile(r'(\d{4})-(\d{1,2})')
+
+# validate_cost_data runs once per record on bulk ingest; keep its
+# constants and error strings out of the per-record path
+_REQUIRED_COST_FIELDS = ('provider', 'service_name', 'cost', 'usage_start_date', 'usage_end_date')
+_INVALID_PROVIDER_MSG = f"Provider must be one of: {', '.join(VALID_PROVIDERS)}"
+_INVALID_CURRENCY_MSG = "Currency must be one of: USD, EUR, GBP, INR, JPY, CNY"
+
+# Post-$match stages of the summary aggregation, built once per group_by.
+# Shared across requests, so they must never be mutated.
+_SUMMARY_GROUP_FIELDS = {
+    'provider': '$provider',
+    'service': '$service_name',
+    'region': '$region',
+    'billing_period': '$billing_period'
+}
+_SUMMARY_STAGES = {
+    group_by: (
+        {"$group": {
+            "_id": group_field,
+            "total_cost": {"$sum": "$cost"},
+            "record_count": {"$sum": 1},
+            "avg_cost": {"$avg": "$cost"},
+            "min_cost": {"$min": "$cost"},
+            "max_cost": {"$max": "$cost"}
+        }},
+        {"$sort": {"total_cost": -1}}
+    )
+    for group_by, group_field in _SUMMARY_GROUP_FIELDS.items()
+}
+
+
+# Per-user results of the dashboard aggregations (filters, summary, daily and
+# monthly trends, comparisons, top resources, page counts), which are
+# re-requested with the same arguments on every refresh.
+# Keyed by (user_id, cost_data_version, function name, args): a write on any
+# worker bumps the version stored on the user, so no worker serves results
+# from before it. Cached results are shared between callers and must not be
+# mutated.
+_RESULT_CACHE = TTLCache(maxsize=10_000, ttl=300)
+_RESULT_CACHE_LOCK = threading.RLock()
+# Cache misses currently being computed, so identical concurrent calls
+# (dashboard widgets mounting together, tab refocus) wait for one query.
+_INFLIGHT: Dict[tuple, Future] = {}
+_INFLIGHT_WAIT_SECONDS = 30
+
+
+def _cached_per_user(func):
+    """
+    Cache successful (True, result) returns of a per-user read function,
+    coalescing concurrent misses for the same arguments into one call.
+    """
+    @wraps(func)
+    def wrapper(user_id, *args, **kwargs):
+        try:
+            version = get_cost_data_version(user_id)
+        except Exception:
+            # Bad id or database error: let the function report it
+            return func(user_id, *args, **kwargs)
+        key = (str(user_id), version, func.__name__, args, tuple(sorted(kwargs.items())))
+        with _RESULT_CACHE_LOCK:
+            cached = _RESULT_CACHE.get(key)
+            if cached is not None:
+                return True, cached
+            pending = _INFLIGHT.get(key)
+            if pending is None:
+                future = _INFLIGHT[key] = Future()
+
+        if pending is not None:
+            try:
+                return pending.result(timeout=_INFLIGHT_WAIT_SECONDS)
+            except Exception:
+                # Leader failed or is too slow; compute independently
+                return func(user_id, *args, **kwargs)
+
+        try:
+            outcome = func(user_id, *args, **kwargs)
+        except BaseException as e:
+            with _RESULT_CACHE_LOCK:
+                if _INFLIGHT.get(key) is future:
+                    del _INFLIGHT[key]
+            future.set_exception(e)
+            raise
+
+        with _RESULT_CACHE_LOCK:
+            # Skip caching if the user's costs were invalidated meanwhile
+            if _INFLIGHT.get(key) is future:
+                del _INFLIGHT[key]
+                if outcome[0]:
+                    _RESULT_CACHE[key] = outcome[1]
+        future.set_result(outcome)
+        return outcome
+    return wrapper
+
+
+def invalidate_user_cost_cache(user_id) -> None:
+    """
+    Record that a user's costs changed: drops this process's cached
+    aggregation results and bumps the user's cost_data_version.
+    """
+    user_id = str(user_id)
+    with _RESULT_CACHE_LOCK:
+        stale_keys = [key for key in _RESULT_CACHE.keys() if key[0] == user_id]
+        for key in stale_keys:
+            _RESULT_CACHE.pop(key, None)
+        for key in [key for key in _INFLIGHT if key[0] == user_id]:
+            del _INFLIGHT[key]
+    try:
+        get_collection(Collections.USERS).update_one(
+            {"_id": ObjectId(user_id)}, {"$inc": {"cost_data_version": 1}}
+        )
+    except Exception as e:
+        logger.error("Error bumping cost data version: %s", e)
+
+
+def get_cost_data_version(user_id: str) -> int:
+    """
+    Counter that changes whenever the user's cost records do. Kept on the
+    user document, so it is consistent across worker processes; reading it
+    is a single _id lookup.
+    """
+    user = get_collection(Collections.USERS).find_one(
+        {"_id": ObjectId(user_id)}, {"cost_data_version": 1}
+    )
+    return (user or {}).get("cost_data_version", 0)
 
 
 def delete_all_costs_for_user(user_id: str) -> bool:
@@ -27,6 +186,7 @@ def delete_all_costs_for_user(user_id: str) -> bool:
     try:
         costs_collection = get_collection(Collections.CLOUD_COSTS)
         costs_collection.delete_many({"user_id": ObjectId(user_id)})
+        invalidate_user_cost_cache(user_id)
         return True
     except Exception as e:
         logger.error("Error clearing user costs: %s", e)
@@ -41,20 +201,13 @@ def validate_cost_data(data: Dict) -> Tuple[bool, Optional[str]]:
         (is_valid, error_message)
     """
     # Required fields
-    required_fields = [
-        'provider', 'service_name', 'cost', 
-        'usage_start_date', 'usage_end_date'
-    ]
-    
-    for field in required_fields:
+    for field in _REQUIRED_COST_FIELDS:
         if field not in data or data[field] is None or data[field] == '':
             return False, f"Field '{field}' is required"
     
     # Validate provider (case-insensitive)
-    provider_lower = data['provider'].strip().lower()
-    valid_lower = [p.lower() for p in VALID_PROVIDERS]
-    if provider_lower not in valid_lower:
-        return False, f"Provider must be one of: {', '.join(VALID_PROVIDERS)}"
+    if data['provider'].strip().lower() not in _PROVIDER_BY_LOWER:
+        return False, _INVALID_PROVIDER_MSG
     
     # Validate cost
     try:
@@ -76,12 +229,12 @@ def validate_cost_data(data: Dict) -> Tuple[bool, Optional[str]]:
     # Validate dates
     try:
         if isinstance(data['usage_start_date'], str):
-            start_date = datetime.fromisoformat(data['usage_start_date'].replace('Z', '+00:00'))
+            start_date = _parse_iso(data['usage_start_date'])
         else:
             start_date = data['usage_start_date']
             
         if isinstance(data['usage_end_date'], str):
-            end_date = datetime.fromisoformat(data['usage_end_date'].replace('Z', '+00:00'))
+            end_date = _parse_iso(data['usage_end_date'])
         else:
             end_date = data['usage_end_date']
         
@@ -100,7 +253,7 @@ def validate_cost_data(data: Dict) -> Tuple[bool, Optional[str]]:
     # Validate currency if provided
     currency = data.get('currency', 'USD')
     if currency not in VALID_CURRENCIES:
-        return False, f"Currency must be one of: {', '.join(VALID_CURRENCIES)}"
+        return False, _INVALID_CURRENCY_MSG
     
     # Validate service_name
     if len(data['service_name'].strip()) < 1:
@@ -131,12 +284,12 @@ def create_cost_record(user_id: str, cost_data: Dict) -> Tuple[bool, any]:
     try:
         # Parse dates
         if isinstance(cost_data['usage_start_date'], str):
-            usage_start_date = datetime.fromisoformat(cost_data['usage_start_date'].replace('Z', '+00:00'))
+            usage_start_date = _parse_iso(cost_data['usage_start_date'])
         else:
             usage_start_date = cost_data['usage_start_date']
             
         if isinstance(cost_data['usage_end_date'], str):
-            usage_end_date = datetime.fromisoformat(cost_data['usage_end_date'].replace('Z', '+00:00'))
+            usage_end_date = _parse_iso(cost_data['usage_end_date'])
         else:
             usage_end_date = cost_data['usage_end_date']
         
@@ -164,6 +317,7 @@ def create_cost_record(user_id: str, cost_data: Dict) -> Tuple[bool, any]:
         # Insert into database
         costs_collection = get_collection(Collections.CLOUD_COSTS)
         result = costs_collection.insert_one(document)
+        invalidate_user_cost_cache(user_id)
         
         return True, str(result.inserted_id)
         
@@ -171,35 +325,22 @@ def create_cost_record(user_id: str, cost_data: Dict) -> Tuple[bool, any]:
         return False, f"Error creating cost record: {str(e)}"
 
 
-def bulk_ingest_costs(user_id: str, cost_records: List[Dict]) -> Tuple[bool, Dict]:
+def _prepare_cost_documents(user_id: str, cost_records: List[Dict]) -> Tuple[List[Dict], List[int], List[Dict]]:
     """
-    Bulk ingest multiple cost records.
-    
-    Args:
-        user_id: Authenticated user's ID
-        cost_records: List of cost data dictionaries
+    Validate cost records and build their Mongo documents.
     
     Returns:
-        (success, result_summary)
+        (documents, record_indexes, errors) - record_indexes[i] is the
+        position in cost_records that documents[i] came from
     """
-    if not cost_records or len(cost_records) == 0:
-        return False, {"error": "No cost records provided"}
-    
-    if len(cost_records) > 1000:
-        return False, {"error": "Cannot ingest more than 1000 records at once"}
-    
-    success_count = 0
-    error_count = 0
     errors = []
-    documents_to_insert = []
-    inserted_ids = []
+    documents = []
+    record_indexes = []
     
-    # First validation and document preparation pass
     for idx, record in enumerate(cost_records):
         # Validate data
         is_valid, error = validate_cost_data(record)
         if not is_valid:
-            error_count += 1
             errors.append({
                 "record_index": idx,
                 "error": error
@@ -209,19 +350,17 @@ def bulk_ingest_costs(user_id: str, cost_records: List[Dict]) -> Tuple[bool, Dic
         try:
             # Parse dates
             if isinstance(record['usage_start_date'], str):
-                usage_start_date = datetime.fromisoformat(record['usage_start_date'].replace('Z', '+00:00'))
+                usage_start_date = _parse_iso(record['usage_start_date'])
             else:
                 usage_start_date = record['usage_start_date']
                 
             if isinstance(record['usage_end_date'], str):
-                usage_end_date = datetime.fromisoformat(record['usage_end_date'].replace('Z', '+00:00'))
+                usage_end_date = _parse_iso(record['usage_end_date'])
             else:
                 usage_end_date = record['usage_end_date']
             
             # Create document
-            # Normalize provider to canonical casing
-            provider_map = {p.lower(): p for p in VALID_PROVIDERS}
-            normalized_provider = provider_map.get(record['provider'].strip().lower(), record['provider'].strip())
+            normalized_provider = _PROVIDER_BY_LOWER.get(record['provider'].strip().lower(), record['provider'].strip())
 
             document = {
                 "user_id": ObjectId(user_id),
@@ -242,25 +381,72 @@ def bulk_ingest_costs(user_id: str, cost_records: List[Dict]) -> Tuple[bool, Dic
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             }
-            documents_to_insert.append(document)
+            documents.append(document)
+            record_indexes.append(idx)
             
         except Exception as e:
-            error_count += 1
             errors.append({
                 "record_index": idx,
                 "error": f"Error parsing record: {str(e)}"
             })
+    
+    return documents, record_indexes, errors
+
+
+def bulk_ingest_costs(user_id: str, cost_records: List[Dict]) -> Tuple[bool, Dict]:
+    """
+    Bulk ingest multiple cost records.
+    
+    Args:
+        user_id: Authenticated user's ID
+        cost_records: List of cost data dictionaries
+    
+    Returns:
+        (success, result_summary)
+    """
+    if not cost_records or len(cost_records) == 0:
+        return False, {"error": "No cost records provided"}
+    
+    if len(cost_records) > Config.MAX_BULK_RECORDS:
+        return False, {"error": f"Cannot ingest more than {Config.MAX_BULK_RECORDS} records at once"}
+    
+    success_count = 0
+    inserted_ids = []
+    
+    # Validation and document preparation pass
+    documents_to_insert, record_indexes, errors = _prepare_cost_documents(user_id, cost_records)
+    error_count = len(errors)
 
-    # Bulk insert if we have documents
+    # Bulk insert if we have documents.
+    # Unordered so the server can apply the batch without stopping at the
+    # first failing document; partial failures are reported per record.
     if documents_to_insert:
         try:
             costs_collection = get_collection(Collections.CLOUD_COSTS)
-            result = costs_collection.insert_many(documents_to_insert)
+            result = costs_collection.insert_many(documents_to_insert, ordered=False)
             success_count = len(result.inserted_ids)
             inserted_ids = [str(id) for id in result.inserted_ids]
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            failed_indexes = {err["index"] for err in write_errors}
+            success_count = e.details.get("nInserted", 0)
+            # insert_many assigns _id client-side, so successful ids are known
+            inserted_ids = [
+                str(doc["_id"]) for i, doc in enumerate(documents_to_insert)
+                if i not in failed_indexes
+            ]
+            error_count += len(write_errors)
+            for err in write_errors:
+                errors.append({
+                    "record_index": record_indexes[err["index"]],
+                    "error": f"Insert failed: {err.get('errmsg', 'unknown error')}"
+                })
         except Exception as e:
             return False, {"error": f"Bulk insertion failed: {str(e)}"}
     
+    if success_count:
+        invalidate_user_cost_cache(user_id)
+    
     return True, {
         "total_records": len(cost_records),
         "success_count": success_count,
@@ -270,6 +456,300 @@ def bulk_ingest_costs(user_id: str, cost_records: List[Dict]) -> Tuple[bool, Dic
     }
 
 
+def bulk_ingest_costs_chunked(user_id: str, cost_records: Iterable[Dict]) -> Tuple[bool, Dict]:
+    """
+    Ingest any number of cost records as MAX_BULK_RECORDS-sized chunks.
+    
+    cost_records may be a generator: chunks are cut from it as they are
+    inserted, and at most Config.BULK_INGEST_WORKERS chunks are in flight
+    at once (insert_many releases the GIL while waiting on the server), so
+    memory is bounded by the chunks in flight rather than the upload size.
+    Chunk summaries are merged into one, with error record_index values
+    relative to cost_records.
+    
+    Returns:
+        (success, result_summary) - False if any chunk failed outright
+    """
+    chunk_size = Config.MAX_BULK_RECORDS
+    records = iter(cost_records)
+    chunks = iter(lambda: list(islice(records, chunk_size)), [])
+    workers = max(1, Config.BULK_INGEST_WORKERS)
+    
+    success_count = 0
+    error_count = 0
+    inserted_ids = []
+    errors = []
+    total_records = 0
+    
+    def merge(start, outcome):
+        nonlocal success_count, error_count
+        ok, chunk_result = outcome
+        if not ok:
+            return chunk_result.get("error", "Bulk ingestion failed")
+        success_count += chunk_result["success_count"]
+        error_count += chunk_result["error_count"]
+        inserted_ids.extend(chunk_result["inserted_ids"])
+        for err in chunk_result["errors"]:
+            errors.append({**err, "record_index": err["record_index"] + start})
+        return None
+    
+    failure = None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((total_records, executor.submit(bulk_ingest_costs, user_id, chunk)))
+            total_records += len(chunk)
+            if len(pending) >= workers:
+                start, future = pending.popleft()
+                failure = merge(start, future.result())
+                if failure:
+                    break
+        for start, future in pending:
+            outcome = future.result()
+            if not failure:
+                failure = merge(start, outcome)
+    
+    if failure:
+        return False, {"error": failure}
+    if not total_records:
+        return False, {"error": "No cost records provided"}
+    
+    return True, {
+        "total_records": total_records,
+        "success_count": success_count,
+        "error_count": error_count,
+        "inserted_ids": inserted_ids,
+        "errors": errors[:10]  # Return first 10 errors only
+    }
+
+
+def _build_cost_query(
+    user_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    provider: Optional[str] = None,
+    service_name: Optional[str] = None,
+    region: Optional[str] = None
+) -> Dict:
+    """Build the Mongo filter shared by the cost listing endpoints."""
+    query = {"user_id": ObjectId(user_id)}
+    
+    # Date range filter - Fixed: Always use usage_start_date for consistency
+    if start_date or end_date:
+        date_filter = {}
+        if start_date:
+            date_filter["$gte"] = start_date
+        if end_date:
+            date_filter["$lte"] = end_date
+        query["usage_start_date"] = date_filter
+    
+    # Provider filter
+    if provider:
+        query["provider"] = provider
+    
+    # Service filter
+    if service_name:
+        query["service_name"] = {"$regex": service_name, "$options": "i"}
+    
+    # Region filter
+    if region:
+        query["region"] = region
+    
+    return query
+
+
+def _serialize_cost(cost: Dict) -> Dict:
+    """Convert ObjectIds and dates on a cost document to JSON-friendly values."""
+    cost['_id'] = str(cost['_id'])
+    cost['user_id'] = str(cost['user_id'])
+    cost['usage_start_date'] = cost['usage_start_date'].isoformat()
+    cost['usage_end_date'] = cost['usage_end_date'].isoformat()
+    cost['created_at'] = cost['created_at'].isoformat()
+    cost['updated_at'] = cost['updated_at'].isoformat()
+    return cost
+
+
+def _encode_page_cursor(sort_by: str, document: Dict, backward: bool = False) -> str:
+    """
+    Opaque keyset cursor anchored on a record: (sort value, _id). A backward
+    cursor selects the records before the anchor instead of after it.
+    """
+    value = document.get(sort_by)
+    if isinstance(value, datetime):
+        token = [sort_by, "d", value.isoformat(), str(document["_id"])]
+    else:
+        token = [sort_by, "v", value, str(document["_id"])]
+    if backward:
+        token.append("b")
+    return base64.urlsafe_b64encode(orjson.dumps(token)).rstrip(b"=").decode("ascii")
+
+
+def _decode_page_cursor(cursor: str, sort_by: str) -> Tuple[any, ObjectId, bool]:
+    """
+    Decode a cursor produced by _encode_page_cursor for the same sort field.
+    
+    Returns:
+        (sort value, anchor _id, backward)
+    
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, kind, value, cursor_id, *direction = orjson.loads(raw)
+        if kind == "d":
+            value = _parse_iso(value)
+        after_oid = ObjectId(cursor_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort_by != sort_by or direction not in ([], ["b"]):
+        raise ValueError("Invalid cursor")
+    return value, after_oid, bool(direction)
+
+
+@_cached_per_user
+def _count_costs(
+    user_id: str,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    provider: Optional[str],
+    service_name: Optional[str],
+    region: Optional[str]
+) -> Tuple[bool, int]:
+    """
+    Number of cost records matching the listing filters (cached until the
+    user's costs change). Counting stops one past PAGINATION_COUNT_LIMIT, so
+    the cost is bounded however many records match.
+    """
+    query = _build_cost_query(user_id, start_date, end_date, provider, service_name, region)
+    limit = Config.PAGINATION_COUNT_LIMIT
+    options = {"limit": limit + 1} if limit > 0 else {}
+    return True, get_collection(Collections.CLOUD_COSTS).count_documents(query, **options)
+
+
+def _cost_page_cursor(
+    user_id: str,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    provider: Optional[str],
+    service_name: Optional[str],
+    region: Optional[str],
+    page: int,
+    page_size: Optional[int],
+    sort_by: str,
+    sort_order: str,
+    after: Optional[str],
+    with_count: bool
+) -> Tuple[any, int, str, Optional[int], bool]:
+    """
+    Open the cursor for one page of cost records.
+    
+    The cursor yields up to page_size + 1 documents; the extra one only tells
+    the caller whether another page exists in the direction of travel. For a
+    backward cursor the documents come in reverse display order.
+    
+    Returns:
+        (cursor, page_size, sort_by actually used, total_count or None,
+        backward)
+    
+    Raises:
+        ValueError: If page/page_size is not positive, or after is not a
+            valid cursor for this sort
+    """
+    # Cheap argument checks first, so bad requests never build a query
+    if page_size is None:
+        page_size = Config.DEFAULT_PAGE_SIZE
+    if page < 1 or page_size < 1:
+        raise ValueError("page and page_size must be positive")
+    page_size = min(page_size, Config.MAX_PAGE_SIZE)
+    
+    # Sorting (_id breaks ties so keyset cursors are stable)
+    if sort_by not in VALID_SORT_FIELDS:
+        sort_by = 'usage_start_date'
+    
+    sort_direction = -1 if sort_order == 'desc' else 1
+    
+    backward = False
+    if after:
+        anchor_value, after_oid, backward = _decode_page_cursor(after, sort_by)
+        if backward:
+            # Walk towards the start of the listing from the anchor
+            sort_direction = -sort_direction
+    
+    query = _build_cost_query(user_id, start_date, end_date, provider, service_name, region)
+    
+    if after:
+        # Records strictly past the anchor in (sort_by, _id) order; the
+        # cursor carries the sort value, so no lookup of the anchor record
+        op = "$lt" if sort_direction == -1 else "$gt"
+        query = {"$and": [query, {"$or": [
+            {sort_by: {op: anchor_value}},
+            {sort_by: anchor_value, "_id": {op: after_oid}}
+        ]}]}
+        skip = 0
+    else:
+        skip = (page - 1) * page_size
+    
+    # Total count is opt-in: count_documents scans every matching record
+    total_count = None
+    if with_count:
+        _, total_count = _count_costs(user_id, start_date, end_date, provider, service_name, region)
+    
+    # Execute query
+    costs_collection = get_collection(Collections.CLOUD_COSTS)
+    cursor = (
+        costs_collection.find(query)
+        .sort([(sort_by, sort_direction), ("_id", sort_direction)])
+        .skip(skip)
+        .limit(page_size + 1)
+    )
+    return cursor, page_size, sort_by, total_count, backward
+
+
+def _pagination_meta(
+    page: int,
+    page_size: int,
+    after: Optional[str],
+    sort_by: str,
+    page_docs: List[Dict],
+    has_more: bool,
+    backward: bool,
+    total_count: Optional[int]
+) -> Dict:
+    """
+    Pagination block returned alongside a page of costs.
+    
+    page_docs is the page in display order (only its first and last records
+    are read, for the cursors); has_more says whether another page exists
+    in the direction the request walked.
+    """
+    if backward:
+        has_next, has_prev = bool(page_docs), has_more
+    else:
+        has_next, has_prev = has_more, bool(after) or page > 1
+    pagination = {
+        "page": None if after else page,
+        "page_size": page_size,
+        "has_next": has_next,
+        "has_prev": has_prev,
+        "next_cursor": _encode_page_cursor(sort_by, page_docs[-1]) if has_next else None,
+        "prev_cursor": (
+            _encode_page_cursor(sort_by, page_docs[0], backward=True)
+            if has_prev and page_docs else None
+        )
+    }
+    if total_count is not None:
+        # Past the count limit only a lower bound is known
+        count_limit = Config.PAGINATION_COUNT_LIMIT
+        is_estimate = 0 < count_limit < total_count
+        if is_estimate:
+            total_count = count_limit
+        pagination["total_count"] = total_count
+        pagination["total_pages"] = (total_count + page_size - 1) // page_size
+        pagination["count_is_estimate"] = is_estimate
+    return pagination
+
+
 def get_costs(
     user_id: str,
     start_date: Optional[datetime] = None,
@@ -280,7 +760,9 @@ def get_costs(
     page: int = 1,
     page_size: int = None,
     sort_by: str = 'usage_start_date',
-    sort_order: str = 'desc'
+    sort_order: str = 'desc',
+    after: Optional[str] = None,
+    with_count: bool = False
 ) -> Tuple[bool, any]:
     """
     Retrieve cost records with filtering, pagination, and sorting.
@@ -292,87 +774,41 @@ def get_costs(
         provider: Filter by provider
         service_name: Filter by service name
         region: Filter by region
-        page: Page number (1-indexed)
+        page: Page number (1-indexed), ignored when after is given
         page_size: Number of records per page
         sort_by: Field to sort by
         sort_order: 'asc' or 'desc'
+        after: Keyset cursor (the next_cursor or prev_cursor of another
+            page); continues from that record without skipping over others
+        with_count: Also return total_count/total_pages (count is cached
+            per user until their costs change)
     
     Returns:
         (success, results_or_error)
     """
     try:
-        # Build query
-        query = {"user_id": ObjectId(user_id)}
-        
-        # Date range filter - Fixed: Always use usage_start_date for consistency
-        if start_date or end_date:
-            date_filter = {}
-            if start_date:
-                date_filter["$gte"] = start_date
-            if end_date:
-                date_filter["$lte"] = end_date
-            query["usage_start_date"] = date_filter
-        
-        # Provider filter
-        if provider:
-            query["provider"] = provider
-        
-        # Service filter
-        if service_name:
-            query["service_name"] = {"$regex": service_name, "$options": "i"}
-        
-        # Region filter
-        if region:
-            query["region"] = region
-        
-        # Pagination
-        if page_size is None:
-            page_size = Config.DEFAULT_PAGE_SIZE
-        page_size = min(page_size, Config.MAX_PAGE_SIZE)
-        skip = (page - 1) * page_size
-        
-        # Sorting
-        valid_sort_fields = ['usage_start_date', 'usage_end_date', 'cost', 'service_name', 'provider', 'created_at']
-        if sort_by not in valid_sort_fields:
-            sort_by = 'usage_start_date'
-        
-        sort_direction = -1 if sort_order == 'desc' else 1
-        
-        # Execute query
-        costs_collection = get_collection(Collections.CLOUD_COSTS)
-        
-        # Get total count
-        total_count = costs_collection.count_documents(query)
-        
-        # Get paginated results
-        cursor = costs_collection.find(query).sort(sort_by, sort_direction).skip(skip).limit(page_size)
-        costs = list(cursor)
+        cursor, page_size, sort_by, total_count, backward = _cost_page_cursor(
+            user_id, start_date, end_date, provider, service_name, region,
+            page, page_size, sort_by, sort_order, after, with_count
+        )
         
-        # Convert ObjectId to string
-        for cost in costs:
-            cost['_id'] = str(cost['_id'])
-            cost['user_id'] = str(cost['user_id'])
-            # Convert dates to ISO format
-            cost['usage_start_date'] = cost['usage_start_date'].isoformat()
-            cost['usage_end_date'] = cost['usage_end_date'].isoformat()
-            cost['created_at'] = cost['created_at'].isoformat()
-            cost['updated_at'] = cost['updated_at'].isoformat()
+        docs = list(cursor)
+        has_more = len(docs) > page_size
+        docs = docs[:page_size]
+        if backward:
+            docs.reverse()
+        pagination = _pagination_meta(page, page_size, after, sort_by, docs, has_more, backward, total_count)
         
-        # Calculate pagination metadata
-        total_pages = (total_count + page_size - 1) // page_size
+        # Convert ObjectId to string and dates to ISO format
+        costs = [_serialize_cost(cost) for cost in docs]
         
         return True, {
             "costs": costs,
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total_count": total_count,
-                "total_pages": total_pages,
-                "has_next": page < total_pages,
-                "has_prev": page > 1
-            }
+            "pagination": pagination
         }
         
+    except ValueError as e:
+        return False, str(e)
     except Exception as e:
         return False, f"Error retrieving costs: {str(e)}"
 
@@ -398,15 +834,7 @@ def get_cost_by_id(user_id: str, cost_id: str) -> Tuple[bool, any]:
         if not cost:
             return False, "Cost record not found or access denied"
         
-        # Convert ObjectId to string
-        cost['_id'] = str(cost['_id'])
-        cost['user_id'] = str(cost['user_id'])
-        cost['usage_start_date'] = cost['usage_start_date'].isoformat()
-        cost['usage_end_date'] = cost['usage_end_date'].isoformat()
-        cost['created_at'] = cost['created_at'].isoformat()
-        cost['updated_at'] = cost['updated_at'].isoformat()
-        
-        return True, cost
+        return True, _serialize_cost(cost)
         
     except Exception as e:
         return False, f"Error retrieving cost: {str(e)}"
@@ -463,7 +891,7 @@ def get_user_cost_data(user_id: str, days: int = 30) -> List[Dict]:
         return cost_data
         
     except Exception as e:
-        logger.error(f"Error fetching user cost data for insights: {e}")
+        logger.error("Error fetching user cost data for insights: %s", e)
         return []
 
 
@@ -507,7 +935,7 @@ def update_cost(user_id: str, cost_id: str, update_data: Dict) -> Tuple[bool, an
         for field in allowed_fields:
             if field in update_data:
                 if field in ['usage_start_date', 'usage_end_date'] and isinstance(update_data[field], str):
-                    update_fields[field] = datetime.fromisoformat(update_data[field].replace('Z', '+00:00'))
+                    update_fields[field] = _parse_iso(update_data[field])
                 else:
                     update_fields[field] = update_data[field]
         
@@ -525,6 +953,7 @@ def update_cost(user_id: str, cost_id: str, update_data: Dict) -> Tuple[bool, an
         
         if result.modified_count == 0:
             return False, "No changes made"
+        invalidate_user_cost_cache(user_id)
         
         # Return updated record
         return get_cost_by_id(user_id, cost_id)
@@ -553,6 +982,7 @@ def delete_cost(user_id: str, cost_id: str) -> Tuple[bool, any]:
         
         if result.deleted_count == 0:
             return False, "Cost record not found or access denied"
+        invalidate_user_cost_cache(user_id)
         
         return True, "Cost record deleted successfully"
         
@@ -560,6 +990,7 @@ def delete_cost(user_id: str, cost_id: str) -> Tuple[bool, any]:
         return False, f"Error deleting cost: {str(e)}"
 
 
+@_cached_per_user
 def get_cost_summary(
     user_id: str,
     start_date: Optional[datetime] = None,
@@ -582,38 +1013,11 @@ def get_cost_summary(
         costs_collection = get_collection(Collections.CLOUD_COSTS)
         
         # Build match stage - Fixed: Always use usage_start_date for consistency
-        match_stage = {"user_id": ObjectId(user_id)}
-        if start_date or end_date:
-            date_filter = {}
-            if start_date:
-                date_filter["$gte"] = start_date
-            if end_date:
-                date_filter["$lte"] = end_date
-            match_stage["usage_start_date"] = date_filter
-        
-        # Map group_by to field name
-        group_field_map = {
-            'provider': '$provider',
-            'service': '$service_name',
-            'region': '$region',
-            'billing_period': '$billing_period'
-        }
+        match_stage = _build_cost_query(user_id, start_date, end_date)
         
-        group_field = group_field_map.get(group_by, '$provider')
-        
-        # Aggregation pipeline
-        pipeline = [
-            {"$match": match_stage},
-            {"$group": {
-                "_id": group_field,
-                "total_cost": {"$sum": "$cost"},
-                "record_count": {"$sum": 1},
-                "avg_cost": {"$avg": "$cost"},
-                "min_cost": {"$min": "$cost"},
-                "max_cost": {"$max": "$cost"}
-            }},
-            {"$sort": {"total_cost": -1}}
-        ]
+        # Unknown group_by values fall back to provider
+        stages = _SUMMARY_STAGES.get(group_by) or _SUMMARY_STAGES['provider']
+        pipeline = [{"$match": match_stage}, *stages]
         
         results = list(costs_collection.aggregate(pipeline))
         
@@ -644,6 +1048,7 @@ def get_cost_summary(
         return False, f"Error generating summary: {str(e)}"
 
 
+@_cached_per_user
 def get_daily_trends(
     user_id: str,
     start_date: Optional[datetime] = None,
@@ -718,6 +1123,7 @@ def get_daily_trends(
         return False, f"Error generating daily trends: {str(e)}"
 
 
+@_cached_per_user
 def get_monthly_trends(
     user_id: str,
     months: int = 6
@@ -789,6 +1195,7 @@ def get_monthly_trends(
         return False, f"Error generating monthly trends: {str(e)}"
 
 
+@_cached_per_user
 def get_cost_comparison(
     user_id: str,
     current_start: datetime,
@@ -898,6 +1305,7 @@ def get_cost_comparison(
         return False, f"Error generating comparison: {str(e)}"
 
 
+@_cached_per_user
 def get_top_resources(
     user_id: str,
     limit: int = 10,
@@ -963,33 +1371,23 @@ def get_top_resources(
         return False, f"Error getting top resources: {str(e)}"
 
 
+@_cached_per_user
 def get_filter_options(user_id: str) -> Tuple[bool, any]:
     """
     Get unique values for filters (services, regions, accounts, providers).
+    
+    Each list is a separate distinct() on a (user_id, field) index, which the
+    server answers by skipping through index keys instead of reading every
+    cost document the user owns. Results are cached per data version by
+    _cached_per_user, so uploads, edits and deletes refresh them.
     """
     try:
         costs_collection = get_collection(Collections.CLOUD_COSTS)
-        pipeline = [
-            {"$match": {"user_id": ObjectId(user_id)}},
-            {"$group": {
-                "_id": None,
-                "services": {"$addToSet": "$service_name"},
-                "regions": {"$addToSet": "$region"},
-                "accounts": {"$addToSet": "$cloud_account_id"},
-                "providers": {"$addToSet": "$provider"}
-            }}
-        ]
-        result = list(costs_collection.aggregate(pipeline))
-        if result:
-            data = result[0]
-            # Clean up and sort
-            return True, {
-                "services": sorted([str(x) for x in data.get('services', []) if x]),
-                "regions": sorted([str(x) for x in data.get('regions', []) if x]),
-                "accounts": sorted([str(x) for x in data.get('accounts', []) if x]),
-                "providers": sorted([str(x) for x in data.get('providers', []) if x]),
-            }
-        return True, {"services": [], "regions": [], "accounts": [], "providers": []}
+        query = {"user_id": ObjectId(user_id)}
+        return True, {
+            key: sorted(str(x) for x in costs_collection.distinct(field, query) if x)
+            for key, field in _FILTER_OPTION_FIELDS
+        }
     except Exception as e:
         return False, f"Error fetching filter options: {str(e)}"
 
@@ -1011,17 +1409,13 @@ def get_auto_trends(user_id: str, breakdown_by: str = 'service', filters: Dict =
         (success, trends_or_error)
     """
     try:
-        costs_collection = get_collection(Collections.CLOUD_COSTS)
+        # Read-only analytics: let secondaries absorb the aggregation load
+        costs_collection = get_collection(Collections.CLOUD_COSTS).with_options(
+            read_preference=ReadPreference.SECONDARY_PREFERRED
+        )
         
-        # Determine grouping field
-        field_map = {
-            'service': '$service_name',
-            'region': '$region',
-            'account': '$cloud_account_id',
-            'provider': '$provider'
-        }
-        # Default to service if invalid value provided
-        breakdown_field = field_map.get(breakdown_by, '$service_name')
+        # Determine grouping field (default to service if invalid value provided)
+        breakdown_field = _TREND_BREAKDOWN_FIELDS.get(breakdown_by, '$service_name')
 
         # Build initial match stage (User check + filters)
         user_oid = ObjectId(user_id)
@@ -1049,7 +1443,8 @@ def get_auto_trends(user_id: str, breakdown_by: str = 'service', filters: Dict =
 
         if month:
             try:
-                month_start = datetime.strptime(month, '%Y-%m')
+                year_str, month_str = _MONTH_RE.fullmatch(month).groups()
+                month_start = datetime(int(year_str), int(month_str), 1)
                 if month_start.month == 12:
                     month_end = month_start.replace(year=month_start.year + 1, month=1)
                 else:
@@ -1058,7 +1453,7 @@ def get_auto_trends(user_id: str, breakdown_by: str = 'service', filters: Dict =
                     '$gte': month_start,
                     '$lt': month_end
                 }
-            except (ValueError, TypeError):
+            except (AttributeError, ValueError, TypeError):
                 pass  # ignore invalid month format, proceed unfiltered
         
         if filters:
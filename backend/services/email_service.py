@@ -13,6 +13,7 @@ from email.message import EmailMessage
 from typing import Dict, Optional
 
 from config import Config
+from services.timeparse import parse_iso
 
 logger = logging.getLogger(__name__)
 _executor = ThreadPoolExecutor(max_workers=2)
@@ -116,7 +117,7 @@ def queue_anomaly_email(
     timestamp = detected_at
     if isinstance(detected_at, str):
         try:
-            timestamp = datetime.fromisoformat(detected_at)
+            timestamp = parse_iso(detected_at)
         except ValueError:
             timestamp = datetime.utcnow()
     elif not isinstance(detected_at, datetime):
@@ -166,7 +167,7 @@ def queue_anomaly_email(
 def send_verification_email(to_email: str, name: str, otp: str) -> None:
     """Queue an OTP verification email."""
     if not is_email_configured():
-        logger.warning(f"Email not configured - skipping verification email for {to_email}")
+        logger.warning("Email not configured - skipping verification email for %s", to_email)
         return  # Don't fail, just skip sending
 
     subject = "Verify Your CloudInsight Account"
@@ -7,8 +7,10 @@ REWRITTEN: Removed pandas dependency for better compatibility
 import io
 import csv
 import json
+import itertools
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, TextIO, Tuple, Union
 
 # Optional import for Excel
 try:
@@ -77,36 +79,45 @@ def parse_date(date_value: Any) -> Optional[datetime]:
         date_str = date_value.strip()
         if not date_str:
             return None
-            
-        date_formats = [
-            '%Y-%m-%d',
-            '%Y/%m/%d',
-            '%m/%d/%Y',
-            '%d/%m/%Y',
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%dT%H:%M:%S',
-            '%Y-%m-%dT%H:%M:%SZ',
-            '%Y-%m-%dT%H:%M:%S.%f',
-            '%Y-%m-%dT%H:%M:%S.%fZ',
-            '%m-%d-%Y',
-            '%d-%m-%Y',
-            '%d-%m-%Y %H:%M',
-            '%m-%d-%Y %H:%M',
-            '%Y%m%d',  # YYYYMMDD format
-            '%d-%b-%Y',  # 01-Jan-2024
-            '%d %b %Y',  # 01 Jan 2024
-        ]
-        
-        for fmt in date_formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
+        return _parse_date_string(date_str)
     
     # Failed to parse
     return None
 
 
+# Formats tried in order by parse_date for string values
+_DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%m/%d/%Y',
+    '%d/%m/%Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S.%fZ',
+    '%m-%d-%Y',
+    '%d-%m-%Y',
+    '%d-%m-%Y %H:%M',
+    '%m-%d-%Y %H:%M',
+    '%Y%m%d',  # YYYYMMDD format
+    '%d-%b-%Y',  # 01-Jan-2024
+    '%d %b %Y',  # 01 Jan 2024
+)
+
+
+# Billing exports repeat the same few dates on thousands of rows, and each
+# miss below costs up to 16 failed strptime calls; datetimes are immutable.
+@lru_cache(maxsize=4096)
+def _parse_date_string(date_str: str) -> Optional[datetime]:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
 def normalize_column_name(col: str) -> str:
     """Normalize column names for flexible matching."""
     if not col:
@@ -197,9 +208,10 @@ def _infer_provider(consumed_service: Optional[str] = None, service_name: Option
     return 'Other'  # Unknown provider - don't guess
 
 
-def extract_cost_records(rows: List[Dict[str, Any]], column_mapping: Dict[str, str], parse_errors: Optional[List[Dict[str, Any]]] = None) -> List[Dict]:
+def extract_cost_records(rows: Iterable[Dict[str, Any]], column_mapping: Dict[str, str], parse_errors: Optional[List[Dict[str, Any]]] = None) -> List[Dict]:
     """
-    Extract cost records from list of dictionaries (rows) using column mapping.
+    Extract cost records from dictionaries (rows) using column mapping.
+    rows may be any iterable, so parsers can feed rows as they read them.
     """
     records = []
     
@@ -326,72 +338,98 @@ def extract_cost_records(rows: List[Dict[str, Any]], column_mapping: Dict[str, s
     return records
 
 
-def parse_csv_file(file_content: bytes) -> Tuple[bool, Any]:
+def _as_binary_stream(file_content: Union[bytes, BinaryIO]) -> BinaryIO:
+    """Accept raw bytes or an open binary file (e.g. an upload's FileStorage.stream)."""
+    if isinstance(file_content, (bytes, bytearray)):
+        return io.BytesIO(file_content)
+    return file_content
+
+
+def _stream_size(stream: BinaryIO) -> int:
+    """Size of a seekable stream in bytes, leaving its position unchanged."""
+    position = stream.tell()
+    stream.seek(0, io.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def _parse_csv_text(text: TextIO) -> Tuple[bool, Any]:
+    """Parse decoded CSV text row by row (raises UnicodeDecodeError on bad input)."""
+    global _LAST_PARSE_SUMMARY
+
+    reader = csv.DictReader(text)
+    
+    # Get headers from the reader
+    if not reader.fieldnames:
+         return False, "CSV file is empty or has no headers"
+         
+    first_row = next(reader, None)
+    if first_row is None:
+         return False, "CSV file contains no data rows"
+
+    # Map columns
+    column_mapping = map_columns(reader.fieldnames)
+    
+    # Check for minimum required columns (provider & end_date can be inferred)
+    required_fields = ['service_name', 'cost', 'usage_start_date']
+    missing_fields = [f for f in required_fields if f not in column_mapping]
+    
+    if missing_fields:
+        available = ', '.join(column_mapping.keys())
+        return False, f"Missing required columns: {', '.join(missing_fields)}. Detected columns: {available}. Please ensure your CSV has at minimum: service_name (or MeterCategory), cost (or CostInBillingCurrency), and a date column."
+    
+    # Extract records straight off the reader; rows are never collected
+    parse_errors = []
+    records = extract_cost_records(itertools.chain((first_row,), reader), column_mapping, parse_errors=parse_errors)
+    
+    if not records:
+        return False, "No valid records could be extracted from the CSV file. Please check that your data rows contain valid service names, costs, and dates."
+
+    _LAST_PARSE_SUMMARY = {
+        "dropped_rows": len(parse_errors),
+        "sample_errors": parse_errors[:5]
+    }
+    
+    return True, records
+
+
+def parse_csv_file(file_content: Union[bytes, BinaryIO]) -> Tuple[bool, Any]:
     """
     Parse CSV file and extract cost records.
+    Reads the file incrementally instead of decoding it into one string.
     """
     try:
         global _LAST_PARSE_SUMMARY
         _LAST_PARSE_SUMMARY = {"dropped_rows": 0, "sample_errors": []}
 
-        # Try different encodings
+        stream = _as_binary_stream(file_content)
+        start = stream.tell()
+
+        # Try different encodings (restarting from the top on a decode error)
         encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-        decoded_content = None
         
         for encoding in encodings:
+            stream.seek(start)
+            text = io.TextIOWrapper(stream, encoding=encoding, newline='')
             try:
-                decoded_content = file_content.decode(encoding)
-                break
+                return _parse_csv_text(text)
             except UnicodeDecodeError:
                 continue
+            finally:
+                # Hand the binary stream back without closing it
+                text.detach()
         
-        if decoded_content is None:
-            return False, "Unable to decode CSV file. Please ensure it's a valid CSV with UTF-8 encoding."
-        
-        # Parse CSV to list of dicts
-        f = io.StringIO(decoded_content)
-        reader = csv.DictReader(f)
-        
-        # Get headers from the reader
-        if not reader.fieldnames:
-             return False, "CSV file is empty or has no headers"
-             
-        rows = list(reader)
-        if not rows:
-             return False, "CSV file contains no data rows"
-
-        # Map columns
-        column_mapping = map_columns(reader.fieldnames)
-        
-        # Check for minimum required columns (provider & end_date can be inferred)
-        required_fields = ['service_name', 'cost', 'usage_start_date']
-        missing_fields = [f for f in required_fields if f not in column_mapping]
-        
-        if missing_fields:
-            available = ', '.join(column_mapping.keys())
-            return False, f"Missing required columns: {', '.join(missing_fields)}. Detected columns: {available}. Please ensure your CSV has at minimum: service_name (or MeterCategory), cost (or CostInBillingCurrency), and a date column."
-        
-        # Extract records
-        parse_errors = []
-        records = extract_cost_records(rows, column_mapping, parse_errors=parse_errors)
-        
-        if not records:
-            return False, "No valid records could be extracted from the CSV file. Please check that your data rows contain valid service names, costs, and dates."
-
-        _LAST_PARSE_SUMMARY = {
-            "dropped_rows": len(parse_errors),
-            "sample_errors": parse_errors[:5]
-        }
-        
-        return True, records
+        return False, "Unable to decode CSV file. Please ensure it's a valid CSV with UTF-8 encoding."
         
     except Exception as e:
         return False, f"Error parsing CSV file: {str(e)}"
 
 
-def parse_excel_file(file_content: bytes) -> Tuple[bool, Any]:
+def parse_excel_file(file_content: Union[bytes, BinaryIO]) -> Tuple[bool, Any]:
     """
     Parse Excel file and extract cost records.
+    Uses openpyxl's read-only mode, which streams rows from the sheet.
     """
     if not openpyxl:
         return False, "openpyxl library is missing (required for .xlsx)"
@@ -401,48 +439,44 @@ def parse_excel_file(file_content: bytes) -> Tuple[bool, Any]:
         _LAST_PARSE_SUMMARY = {"dropped_rows": 0, "sample_errors": []}
 
         # Load workbook
-        wb = openpyxl.load_workbook(filename=io.BytesIO(file_content), data_only=True)
-        sheet = wb.active
-        
-        if sheet.max_row < 2:
-            return False, "Excel file is empty"
+        wb = openpyxl.load_workbook(filename=_as_binary_stream(file_content), read_only=True, data_only=True)
+        try:
+            sheet = wb.active
+            sheet_rows = sheet.iter_rows(values_only=True)
             
-        # Get headers (first row)
-        headers = []
-        for cell in sheet[1]:
-            headers.append(str(cell.value) if cell.value is not None else "")
+            # Get headers (first row)
+            header_row = next(sheet_rows, None)
+            if header_row is None:
+                return False, "Excel file is empty"
+            headers = [str(value) if value is not None else "" for value in header_row]
+                
+            # Rows as dicts, skipping rows with no values under a header
+            rows = (
+                row_dict
+                for row_dict in (dict(zip(headers, values)) for values in sheet_rows)
+                if any(value is not None for value in row_dict.values())
+            )
+            first_row = next(rows, None)
+            if first_row is None:
+                return False, "Excel file contains no data rows"
+
+            # Map columns
+            column_mapping = map_columns(headers)
             
-        # Parse rows to list of dicts
-        rows = []
-        for row in sheet.iter_rows(min_row=2):
-            row_dict = {}
-            has_data = False
-            for idx, cell in enumerate(row):
-                if idx < len(headers):
-                    header = headers[idx]
-                    row_dict[header] = cell.value
-                    if cell.value is not None:
-                        has_data = True
-            if has_data:
-                rows.append(row_dict)
-        
-        if not rows:
-            return False, "Excel file contains no data rows"
-
-        # Map columns
-        column_mapping = map_columns(headers)
-        
-        # Check for minimum required columns (provider & end_date can be inferred)
-        required_fields = ['service_name', 'cost', 'usage_start_date']
-        missing_fields = [f for f in required_fields if f not in column_mapping]
-        
-        if missing_fields:
-            available = ', '.join(column_mapping.keys())
-            return False, f"Missing required columns: {', '.join(missing_fields)}. Detected columns: {available}. Please ensure your Excel has at minimum: service_name, cost, and a date column."
-        
-        # Extract records
-        parse_errors = []
-        records = extract_cost_records(rows, column_mapping, parse_errors=parse_errors)
+            # Check for minimum required columns (provider & end_date can be inferred)
+            required_fields = ['service_name', 'cost', 'usage_start_date']
+            missing_fields = [f for f in required_fields if f not in column_mapping]
+            
+            if missing_fields:
+                available = ', '.join(column_mapping.keys())
+                return False, f"Missing required columns: {', '.join(missing_fields)}. Detected columns: {available}. Please ensure your Excel has at minimum: service_name, cost, and a date column."
+            
+            # Extract records
+            parse_errors = []
+            records = extract_cost_records(itertools.chain((first_row,), rows), column_mapping, parse_errors=parse_errors)
+        finally:
+            # Read-only workbooks keep the source open until closed
+            wb.close()
         
         if not records:
             return False, "No valid records could be extracted from the Excel file. Please check that your data rows contain valid service names, costs, and dates."
@@ -458,16 +492,22 @@ def parse_excel_file(file_content: bytes) -> Tuple[bool, Any]:
         return False, f"Error parsing Excel file: {str(e)}"
 
 
-def parse_file(filename: str, file_content: bytes) -> Tuple[bool, Any]:
+def parse_file(filename: str, file_content: Union[bytes, BinaryIO]) -> Tuple[bool, Any]:
     """
     Parse uploaded file (CSV or Excel) and extract cost records.
+    file_content may be the raw bytes or a seekable binary stream such as
+    an upload's FileStorage.stream, which avoids buffering the whole file.
     """
     # Validate file extension
     if not is_allowed_file(filename):
         return False, f"File type not allowed. Supported formats: {', '.join(ALLOWED_EXTENSIONS)}"
     
     # Validate file size
-    is_valid_size, error = validate_file_size(len(file_content))
+    if isinstance(file_content, (bytes, bytearray)):
+        file_size = len(file_content)
+    else:
+        file_size = _stream_size(file_content)
+    is_valid_size, error = validate_file_size(file_size)
     if not is_valid_size:
         return False, error
     
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Any
 from bson import ObjectId
 from database import get_collection, Collections
+from services.timeparse import parse_iso
 import pandas as pd
 import numpy as np
 import logging
@@ -249,7 +250,7 @@ def predict_future_costs(
         for d in data:
             d_date = d['_id']['date']
             if isinstance(d_date, str):
-                try: d_date = datetime.fromisoformat(d_date.replace('Z', '+00:00'))
+                try: d_date = parse_iso(d_date)
                 except: pass
             
             if not isinstance(d_date, datetime):
@@ -0,0 +1,70 @@
+"""
+Ingestion Jobs - run large uploads off the request thread.
+
+The request only saves the upload and records a job; parsing, inserting
+and the summary happen on a small thread pool. Job state is kept in
+MongoDB rather than in-process, so a status poll answered by any gunicorn
+worker sees it.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+from bson import ObjectId
+from database import get_collection, Collections
+
+logger = logging.getLogger(__name__)
+
+_ingestion_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ingestion-job')
+
+
+def _set_job_state(job_id: str, **state) -> None:
+    state["updated_at"] = datetime.utcnow()
+    get_collection(Collections.INGESTION_JOBS).update_one({"_id": job_id}, {"$set": state})
+
+
+def submit_ingestion_job(user_id: str, filename: str, work: Callable[[], Tuple[bool, Dict]]) -> str:
+    """
+    Queue work (returning (success, summary_or_error_dict)) on the ingestion
+    pool. Returns a job id whose progress get_ingestion_job reports.
+    """
+    job_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    get_collection(Collections.INGESTION_JOBS).insert_one({
+        "_id": job_id,
+        "user_id": ObjectId(user_id),
+        "filename": filename,
+        "status": "queued",
+        "created_at": now,
+        "updated_at": now
+    })
+
+    def _worker():
+        _set_job_state(job_id, status="running")
+        try:
+            success, result = work()
+        except Exception as e:
+            logger.exception("Background ingestion failed")
+            success, result = False, {"error": f"Error: {str(e)}"}
+
+        if success:
+            _set_job_state(job_id, status="completed", result=result)
+        else:
+            _set_job_state(job_id, status="failed", error=result.get("error", "Ingestion failed"))
+
+    _ingestion_executor.submit(_worker)
+    return job_id
+
+
+def get_ingestion_job(user_id: str, job_id: str) -> Optional[Dict]:
+    """State of a background ingestion job, or None if unknown to this user."""
+    job = get_collection(Collections.INGESTION_JOBS).find_one(
+        {"_id": job_id, "user_id": ObjectId(user_id)},
+        {"user_id": 0}
+    )
+    if job is None:
+        return None
+    job["job_id"] = job.pop("_id")
+    return job
@@ -7,6 +7,7 @@ from io import StringIO, BytesIO
 from datetime import datetime, timedelta
 from bson import ObjectId
 from database import get_collection, Collections
+from services.timeparse import parse_iso
 
 try:
     from ml.category_mapper import get_category
@@ -28,7 +29,7 @@ def _coerce_datetime(value):
         return value
     if isinstance(value, str):
         try:
-            return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+            return parse_iso(value).replace(tzinfo=None)
         except Exception:
             try:
                 return datetime.strptime(value[:10], '%Y-%m-%d')
@@ -220,17 +221,28 @@ def generate_resource_utilization_report(user_id):
     Returns (success, csv_string_or_error)
     """
     try:
-        # Get all costs for user
-        costs = _get_user_costs(user_id)
-        
-        if not costs:
+        # Roll up per service in MongoDB so only one row per service crosses
+        # the wire instead of every cost document.
+        costs_collection = get_collection(Collections.CLOUD_COSTS)
+        groups = list(costs_collection.aggregate([
+            {"$match": {"user_id": _to_object_id(user_id)}},
+            {"$group": {
+                "_id": {"service": "$service_name", "category": "$category"},
+                "total_cost": {"$sum": "$cost"},
+                "count": {"$sum": 1},
+                "provider": {"$first": "$provider"}
+            }}
+        ]))
+        
+        if not groups:
             return False, "No cost data found"
         
-        # Aggregate by service and category
+        # Aggregate by service and category (category mapping runs in Python,
+        # so groups that resolve to the same category are merged here)
         service_stats = {}
-        for cost in costs:
-            service = cost.get('service_name', 'Unknown')
-            category = _extract_category(service, cost.get('category'))
+        for group in groups:
+            service = group['_id'].get('service') or 'Unknown'
+            category = _extract_category(service, group['_id'].get('category'))
             key = f"{service}|{category}"
             
             if key not in service_stats:
@@ -239,11 +251,11 @@ def generate_resource_utilization_report(user_id):
                     'category': category,
                     'total_cost': 0,
                     'count': 0,
-                    'provider': cost.get('provider', '')
+                    'provider': group.get('provider') or ''
                 }
             
-            service_stats[key]['total_cost'] += cost.get('cost', 0)
-            service_stats[key]['count'] += 1
+            service_stats[key]['total_cost'] += group['total_cost']
+            service_stats[key]['count'] += group['count']
         
         # Generate CSV
         output = StringIO()
@@ -351,30 +363,59 @@ def generate_executive_overview(user_id):
         end_date = datetime.now()
         start_date = end_date - timedelta(days=90)
 
-        all_costs = _get_user_costs(user_id)
-        costs = []
-        for cost in all_costs:
+        # Sum per (provider, service, category) in MongoDB for dated records;
+        # the Python side then maps each distinct service to a category once
+        # instead of once per cost document.
+        costs_collection = get_collection(Collections.CLOUD_COSTS)
+        user_oid = _to_object_id(user_id)
+        groups = list(costs_collection.aggregate([
+            {"$match": {
+                "user_id": user_oid,
+                "usage_start_date": {"$gte": start_date, "$lte": end_date}
+            }},
+            {"$group": {
+                "_id": {"provider": "$provider", "service": "$service_name", "category": "$category"},
+                "cost": {"$sum": "$cost"},
+                "count": {"$sum": 1}
+            }}
+        ]))
+
+        # Records without a datetime usage_start_date (legacy 'date' field or
+        # string values) still go through the Python date coercion
+        legacy_costs = costs_collection.find(
+            {"user_id": user_oid, "usage_start_date": {"$not": {"$type": "date"}}},
+            {"usage_start_date": 1, "date": 1, "provider": 1, "service_name": 1, "category": 1, "cost": 1}
+        )
+        for cost in legacy_costs:
             d = _extract_cost_date(cost)
             if d and start_date <= d <= end_date:
-                costs.append(cost)
-        
-        if not costs:
+                groups.append({
+                    "_id": {
+                        "provider": cost.get('provider', 'Unknown'),
+                        "service": cost.get('service_name'),
+                        "category": cost.get('category')
+                    },
+                    "cost": cost.get('cost', 0),
+                    "count": 1
+                })
+        
+        if not groups:
             return False, "No cost data found for the last 90 days"
         
-        # Calculate metrics
-        total_cost = sum(c.get('cost', 0) for c in costs)
-        
-        # Group by provider
+        # Calculate metrics and group by provider / category
+        total_cost = 0
+        record_count = 0
         provider_costs = {}
-        for cost in costs:
-            provider = cost.get('provider', 'Unknown')
-            provider_costs[provider] = provider_costs.get(provider, 0) + cost.get('cost', 0)
-        
-        # Group by category
         category_costs = {}
-        for cost in costs:
-            category = _extract_category(cost.get('service_name', ''), cost.get('category'))
-            category_costs[category] = category_costs.get(category, 0) + cost.get('cost', 0)
+        for group in groups:
+            key = group['_id']
+            cost = group['cost'] or 0
+            total_cost += cost
+            record_count += group['count']
+            provider = key.get('provider', 'Unknown')
+            provider_costs[provider] = provider_costs.get(provider, 0) + cost
+            category = _extract_category(key.get('service') or '', key.get('category'))
+            category_costs[category] = category_costs.get(category, 0) + cost
         
         # Generate CSV
         output = StringIO()
@@ -386,7 +427,7 @@ def generate_executive_overview(user_id):
         writer.writerow(['Report Generated:', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
         writer.writerow(['Period:', f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"])
         writer.writerow(['Total Cost:', f"${total_cost:.2f}"])
-        writer.writerow(['Total Records:', len(costs)])
+        writer.writerow(['Total Records:', record_count])
         writer.writerow([])
         
         # Cost by Provider
@@ -0,0 +1,24 @@
+"""
+ISO 8601 timestamp parsing shared by the services and routes.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+# Optional C ISO-8601 parser; datetime.fromisoformat is the fallback
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
+
+# Dashboards send the same date-picker bounds on every request and ingested
+# files repeat the same day many times; datetimes are immutable, so cache.
+@lru_cache(maxsize=4096)
+def parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp (trailing 'Z' allowed). Raises ValueError."""
+    if ciso8601 is not None:
+        return ciso8601.parse_datetime(value)
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
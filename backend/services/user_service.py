@@ -3,9 +3,15 @@ User Service - Handle user management and authentication with MongoDB
 """
 
 import re
+import time
+import hashlib
+import threading
 import bcrypt
 import jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import logging
+from cachetools import TTLCache
 from datetime import datetime, timedelta
 from bson import ObjectId
 from database import get_collection, Collections
@@ -14,6 +20,52 @@ from config import Config
 
 logger = logging.getLogger(__name__)
 
+_PASSWORD_HASHER = PasswordHasher(
+    time_cost=Config.ARGON2_TIME_COST,
+    memory_cost=Config.ARGON2_MEMORY_COST,
+    parallelism=Config.ARGON2_PARALLELISM,
+    hash_len=32,
+    salt_len=16,
+)
+
+# Authenticated tokens (signature valid and user exists) keyed by token
+# digest -> (user_id, exp), so repeat requests skip both the signature check
+# and the users lookup. Entries live at most JWT_CACHE_TTL_SECONDS (<= 60),
+# which bounds how long a deleted user's token keeps working.
+_AUTH_CACHE = TTLCache(maxsize=10_000, ttl=max(Config.JWT_CACHE_TTL_SECONDS, 1))
+_AUTH_CACHE_LOCK = threading.Lock()
+
+# Recent email -> registered lookups for the availability check, which the
+# signup form calls on every keystroke.
+_EMAIL_EXISTS_CACHE = TTLCache(maxsize=10_000, ttl=5)
+_EMAIL_EXISTS_LOCK = threading.Lock()
+
+# Registration field patterns, compiled once
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_NAME_RE = re.compile(r"^[a-zA-Z\s\-']+$")
+_UPPER_RE = re.compile(r'[A-Z]')
+_LOWER_RE = re.compile(r'[a-z]')
+_DIGIT_RE = re.compile(r'\d')
+_SPECIAL_RE = re.compile(r'[!@#$%^&*(),.?":{}|<>\-_+=\[\];~/\\]')
+
+# Shared JWT decoder, built once instead of going through the module-level
+# jwt.decode wrapper on every request.
+_JWT_DECODER = jwt.PyJWT()
+# Key, algorithm and required claims are fixed for the process; decoding
+# enforces exp/user_id itself (MissingRequiredClaimError is an
+# InvalidTokenError), so callers need no separate claim checks.
+_JWT_DECODE_KWARGS = {
+    "key": Config.JWT_SECRET_KEY,
+    "algorithms": [Config.JWT_ALGORITHM],
+    "options": {"require": ["exp", "user_id"]},
+}
+_JWT_CACHE_ENABLED = Config.JWT_CACHE_ENABLED and Config.JWT_CACHE_TTL_SECONDS > 0
+
+
+def _token_key(token):
+    """Compact cache key for a token (avoids holding raw tokens in memory)."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 
 def validate_email(email):
     """
@@ -23,13 +75,12 @@ def validate_email(email):
     if not email:
         return False, "Email is required"
     
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(email_pattern, email):
-        return False, "Invalid email format"
-    
     if len(email) > 255:
         return False, "Email is too long"
     
+    if not _EMAIL_RE.match(email):
+        return False, "Invalid email format"
+    
     return True, None
 
 
@@ -44,16 +95,16 @@ def validate_password(password):
     if len(password) > 128:
         return False, "Password is too long (max 128 characters)"
     
-    if not re.search(r'[A-Z]', password):
+    if not _UPPER_RE.search(password):
         return False, "Password must contain at least one uppercase letter"
     
-    if not re.search(r'[a-z]', password):
+    if not _LOWER_RE.search(password):
         return False, "Password must contain at least one lowercase letter"
     
-    if not re.search(r'\d', password):
+    if not _DIGIT_RE.search(password):
         return False, "Password must contain at least one digit"
     
-    if not re.search(r'[!@#$%^&*(),.?":{}|<>\-_+=\[\];~/\\]', password):
+    if not _SPECIAL_RE.search(password):
         return False, "Password must contain at least one special character"
     
     return True, None
@@ -73,26 +124,65 @@ def validate_name(name):
     if len(name) > 100:
         return False, "Name is too long (max 100 characters)"
     
-    if not re.match(r"^[a-zA-Z\s\-']+$", name):
+    if not _NAME_RE.match(name):
         return False, "Name can only contain letters, spaces, hyphens, and apostrophes"
     
     return True, None
 
 
 def hash_password(password):
-    """Hash password using bcrypt."""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(Config.BCRYPT_LOG_ROUNDS)).decode('utf-8')
+    """Hash password using Argon2id."""
+    return _PASSWORD_HASHER.hash(password)
+
+
+def _is_argon2_hash(password_hash):
+    return password_hash.startswith('$argon2')
 
 
 def check_password(password, password_hash):
-    """Verify password against hash."""
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    """Verify password against an Argon2id or legacy bcrypt hash."""
+    if not _is_argon2_hash(password_hash):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        except ValueError:
+            # Malformed bcrypt hash
+            return False
+    try:
+        return _PASSWORD_HASHER.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        # Mismatch (VerifyMismatchError), or a corrupt/truncated hash
+        return False
 
 
-def email_exists(email):
-    """Check if email already exists in database."""
+def password_needs_rehash(password_hash):
+    """True for legacy bcrypt hashes or Argon2 hashes made with older parameters."""
+    if not _is_argon2_hash(password_hash):
+        return True
+    try:
+        return _PASSWORD_HASHER.check_needs_rehash(password_hash)
+    except InvalidHashError:
+        return True
+
+
+def email_exists(email, cached=False):
+    """
+    Check if email already exists in database.
+    With cached=True a lookup from the last few seconds may be reused
+    (fine for form feedback; registration always asks the database).
+    """
+    email = email.lower()
+    if cached:
+        with _EMAIL_EXISTS_LOCK:
+            exists = _EMAIL_EXISTS_CACHE.get(email)
+        if exists is not None:
+            return exists
+
     users_collection = get_collection(Collections.USERS)
-    return users_collection.find_one({"email": email.lower()}) is not None
+    # Point lookup on the unique email index, fetching only _id
+    exists = users_collection.find_one({"email": email}, {"_id": 1}) is not None
+    with _EMAIL_EXISTS_LOCK:
+        _EMAIL_EXISTS_CACHE[email] = exists
+    return exists
 
 
 def get_user_by_email(email):
@@ -116,7 +206,7 @@ def create_user(name, email, password):
     Create a new user with validation.
     Returns (success, user_data_or_error_message)
     """
-    logger.info(f"[CREATE_USER] Starting for {email}")
+    logger.info("[CREATE_USER] Starting for %s", email)
     
     # Validate name
     is_valid, error = validate_name(name)
@@ -128,15 +218,15 @@ def create_user(name, email, password):
     if not is_valid:
         return False, error
     
-    # Check if email already exists
-    if email_exists(email):
-        return False, "Email already registered"
-    
     # Validate password
     is_valid, error = validate_password(password)
     if not is_valid:
         return False, error
     
+    # Check if email already exists (only once every in-memory check passed)
+    if email_exists(email):
+        return False, "Email already registered"
+    
     # Hash password
     password_hash = hash_password(password)
     
@@ -150,8 +240,10 @@ def create_user(name, email, password):
     # Insert into database
     users_collection = get_collection(Collections.USERS)
     result = users_collection.insert_one(user_doc)
+    with _EMAIL_EXISTS_LOCK:
+        _EMAIL_EXISTS_CACHE[email.lower()] = True
     
-    logger.info(f"[CREATE_USER] User {email} created and automatically verified (email verification skipped)")
+    logger.info("[CREATE_USER] User %s created and automatically verified (email verification skipped)", email)
     
     # Return user without password
     return True, {
@@ -191,11 +283,14 @@ def authenticate_user(email, password):
     if not user.get('is_verified', True):
         return False, "verify_required"
     
-    # Update last login
+    # Update last login, upgrading the stored hash if its parameters are outdated
+    updates = {"updated_at": datetime.utcnow()}
+    if password_needs_rehash(user['password_hash']):
+        updates["password_hash"] = hash_password(password)
     users_collection = get_collection(Collections.USERS)
     users_collection.update_one(
         {"_id": user['_id']},
-        {"$set": {"updated_at": datetime.utcnow()}}
+        {"$set": updates}
     )
     
     # Return user without password
@@ -220,13 +315,56 @@ def generate_token(user_data):
     return token
 
 
+def decode_token(token):
+    """
+    Decode and verify a JWT.
+    Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError like jwt.decode.
+    """
+    return _JWT_DECODER.decode(token, **_JWT_DECODE_KWARGS)
+
+
+def authenticate_token(token):
+    """
+    Resolve a bearer token to the id of an existing user.
+    Returns None if the token is valid but its user no longer exists.
+    Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError like jwt.decode.
+    """
+    key = _token_key(token) if _JWT_CACHE_ENABLED else None
+    if key is not None:
+        with _AUTH_CACHE_LOCK:
+            entry = _AUTH_CACHE.get(key)
+        if entry is not None:
+            user_id, exp = entry
+            # A cached token may still expire inside the cache TTL window
+            if exp > time.time():
+                return user_id
+            with _AUTH_CACHE_LOCK:
+                _AUTH_CACHE.pop(key, None)
+            raise jwt.ExpiredSignatureError("Signature has expired")
+
+    payload = decode_token(token)
+    user_id = payload['user_id']
+    try:
+        exists = get_collection(Collections.USERS).find_one({"_id": ObjectId(user_id)}, {"_id": 1})
+    except Exception:
+        logger.exception("Error checking user for token")
+        exists = None
+    if not exists:
+        return None
+
+    if key is not None:
+        with _AUTH_CACHE_LOCK:
+            _AUTH_CACHE[key] = (user_id, payload['exp'])
+    return user_id
+
+
 def verify_token(token):
     """
     Verify JWT token and return user data.
     Returns (success, user_data_or_error_message)
     """
     try:
-        payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
+        payload = decode_token(token)
         user = get_user_by_id(payload['user_id'])
         
         if not user:
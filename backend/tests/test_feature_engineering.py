@@ -0,0 +1,40 @@
+"""
+Parity between the numba feature kernel and the NumPy implementation.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("numba")
+pytest.importorskip("pandas")
+
+from ml import feature_engineering
+from ml._features_numba import engineer_features
+
+
+def _numpy_features(cost, monkeypatch):
+    monkeypatch.setattr(feature_engineering, "_engineer_features_jit", None)
+    return feature_engineering._compute_features(cost)
+
+
+@pytest.mark.parametrize("base", [1.0, 1e6, 1e9, 1e12])
+def test_kernel_matches_numpy(base, monkeypatch):
+    rng = np.random.default_rng(42)
+    cost = base + rng.normal(0.0, base * 1e-6 + 1.0, size=200)
+    cost[50] = np.nan
+
+    expected = _numpy_features(cost, monkeypatch)
+    actual = engineer_features(cost, feature_engineering.ROLLING_WINDOW, feature_engineering.EPSILON)
+
+    for want, got in zip(expected, actual):
+        np.testing.assert_allclose(got, want, rtol=1e-9, equal_nan=True)
+
+
+def test_constant_window_has_zero_std():
+    cost = np.full(30, 123456789.123)
+    _, _, _, rolling_std, _, _ = engineer_features(
+        cost, feature_engineering.ROLLING_WINDOW, feature_engineering.EPSILON
+    )
+    valid = rolling_std[~np.isnan(rolling_std)]
+    assert valid.size and (valid >= 0).all()
+    np.testing.assert_allclose(valid, 0.0, atol=1e-6)